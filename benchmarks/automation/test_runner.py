@@ -14,22 +14,35 @@ Goal: Demonstrate cs --hybrid's advantages:
 - 85%+ reduction in context tokens
 - Faster task completion
 - Higher success rate
+
+Task YAML is parsed with PyYAML's libyaml bindings (CSafeLoader) when
+available; without libyaml it falls back to the pure-Python SafeLoader.
 """
 
+import functools
 import sys
 from pathlib import Path
 import yaml
-import json
 import time
-from typing import List, Dict, Any, Tuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
-import statistics
 
-# Add agents to path
+# Add agents to path. The agents themselves are imported lazily where they are
+# instantiated, so --help and task filtering don't pay for their import graph.
 sys.path.insert(0, str(Path(__file__).parent.parent / "real_world" / "agents"))
 
-from baseline_agent import BaselineAgent
-from cs_hybrid_agent import CSHybridAgent
+from agent_common import dumps_json  # noqa: E402
+
+if TYPE_CHECKING:
+    from baseline_agent import BaselineAgent
+    from cs_hybrid_agent import CSHybridAgent
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
 
 
 @dataclass
@@ -63,6 +76,66 @@ class ComparisonMetrics:
     recall_improvement: float
 
 
+# Column indices of the per-task matrix built by generate_summary_report
+(_COL_CALL_REDUCTION, _COL_TOKEN_REDUCTION, _COL_TIME_REDUCTION,
+ _COL_BASELINE_PRECISION, _COL_CS_PRECISION, _COL_BASELINE_RECALL, _COL_CS_RECALL,
+ _COL_BASELINE_SUCCESS, _COL_CS_SUCCESS) = range(9)
+
+
+def _pct_reduction(baseline: float, cs: float) -> float:
+    """Percent reduction of cs relative to baseline (0.0 when baseline is zero)"""
+    return (baseline - cs) / baseline * 100.0 if baseline > 0 else 0.0
+
+
+# Per-process worker state, set once by _worker_init: the agents reused across tasks
+_worker_runner = None
+_baseline_agent = None
+_cs_agent = None
+
+
+def _worker_init(repo_path: str, verbose: bool):
+    """
+    Pool initializer: build the worker's agents once, so any per-agent setup
+    is paid per process rather than per task.
+    """
+    from baseline_agent import BaselineAgent
+    from cs_hybrid_agent import CSHybridAgent
+
+    global _worker_runner, _baseline_agent, _cs_agent
+    _worker_runner = TestRunner(repo_path, verbose=verbose)
+    _baseline_agent = BaselineAgent(_worker_runner.repo_path, verbose=verbose)
+    _cs_agent = CSHybridAgent(_worker_runner.repo_path, verbose=verbose)
+
+
+def _run_task_worker(task: Dict[str, Any]) -> "ComparisonMetrics":
+    """
+    Run a single task in a worker process using the agents built by _worker_init.
+
+    Agents live only in the child, so they never need to be pickled.
+    """
+    return _worker_runner.run_single_task(task, _baseline_agent, _cs_agent)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_tasks_cached(path: str, mtime: float) -> Tuple[Dict[str, Any], ...]:
+    """
+    Parse task definitions from YAML, memoized on (path, mtime).
+
+    Editing the file bumps its mtime and therefore misses the cache.
+    """
+    # Parse YAML - handle both list and individual task formats
+    tasks = []
+    with open(path) as f:
+        for doc in yaml.load_all(f, Loader=_YamlLoader):
+            if isinstance(doc, list):
+                tasks.extend(doc)
+            elif isinstance(doc, dict) and 'id' in doc:
+                tasks.append(doc)
+
+    # Filter out metadata
+    return tuple(t for t in tasks if isinstance(t, dict) and 'id' in t)
+
+
 class TestRunner:
     """Orchestrates benchmark execution and evaluation"""
 
@@ -70,40 +143,34 @@ class TestRunner:
         self.repo_path = Path(repo_path)
         self.verbose = verbose
         self.results: List[ComparisonMetrics] = []
+        # Worker processes used for the last run_all_tasks; with more than one,
+        # agents compete for CPU and I/O and their timings are not comparable
+        self.parallel = 1
 
     def load_tasks(self, tasks_file: Path) -> List[Dict[str, Any]]:
         """Load task definitions from YAML"""
-        with open(tasks_file) as f:
-            content = f.read()
-
-        # Parse YAML - handle both list and individual task formats
-        tasks = []
-        for doc in yaml.safe_load_all(content):
-            if isinstance(doc, list):
-                tasks.extend(doc)
-            elif isinstance(doc, dict) and 'id' in doc:
-                tasks.append(doc)
-
-        # Filter out metadata
-        tasks = [t for t in tasks if isinstance(t, dict) and 'id' in t]
+        tasks_file = Path(tasks_file)
+        tasks = list(_parse_tasks_cached(str(tasks_file), tasks_file.stat().st_mtime))
 
         if self.verbose:
             print(f"Loaded {len(tasks)} tasks")
-            categories = {}
-            for task in tasks:
-                cat = task.get('category', 'unknown')
-                categories[cat] = categories.get(cat, 0) + 1
-            print(f"Categories: {categories}")
+            categories = Counter(task.get('category', 'unknown') for task in tasks)
+            print(f"Categories: {dict(categories)}")
 
         return tasks
 
     def run_single_task(
         self,
         task: Dict[str, Any],
-        baseline_agent: BaselineAgent,
-        cs_agent: CSHybridAgent
+        baseline_agent: "BaselineAgent",
+        cs_agent: "CSHybridAgent"
     ) -> ComparisonMetrics:
-        """Run both agents on a single task and compare results"""
+        """
+        Run both agents on a single task and compare results
+
+        The agents run one after the other, so neither's total_duration
+        includes contention from the other.
+        """
 
         task_id = task['id']
         category = task.get('category', 'unknown')
@@ -126,22 +193,11 @@ class TestRunner:
         cs_run = cs_agent.execute_task(task)
 
         # Calculate improvements
-        call_reduction = (
-            (baseline_run.total_calls - cs_run.total_calls) / baseline_run.total_calls * 100
-            if baseline_run.total_calls > 0 else 0.0
-        )
-
-        token_reduction = (
-            (baseline_run.total_output_tokens - cs_run.total_output_tokens) /
-            baseline_run.total_output_tokens * 100
-            if baseline_run.total_output_tokens > 0 else 0.0
-        )
-
-        time_reduction = (
-            (baseline_run.total_duration - cs_run.total_duration) /
-            baseline_run.total_duration * 100
-            if baseline_run.total_duration > 0 else 0.0
+        call_reduction = _pct_reduction(baseline_run.total_calls, cs_run.total_calls)
+        token_reduction = _pct_reduction(
+            baseline_run.total_output_tokens, cs_run.total_output_tokens
         )
+        time_reduction = _pct_reduction(baseline_run.total_duration, cs_run.total_duration)
 
         precision_improvement = cs_run.precision - baseline_run.precision
         recall_improvement = cs_run.recall - baseline_run.recall
@@ -204,24 +260,57 @@ class TestRunner:
     def run_all_tasks(
         self,
         tasks: List[Dict[str, Any]],
-        max_tasks: Optional[int] = None
+        max_tasks: Optional[int] = None,
+        parallel: int = 1
     ) -> List[ComparisonMetrics]:
-        """Run benchmark on all tasks"""
+        """
+        Run benchmark on all tasks
 
-        baseline_agent = BaselineAgent(self.repo_path, verbose=self.verbose)
-        cs_agent = CSHybridAgent(self.repo_path, verbose=self.verbose)
+        With parallel > 1, tasks are dispatched to a process pool; results
+        are returned in the original task order either way. Call, token and
+        precision/recall metrics are unaffected, but durations then include
+        contention from the other workers, so the time metrics are not
+        comparable to a sequential run.
+        """
 
-        results = []
         tasks_to_run = tasks[:max_tasks] if max_tasks else tasks
 
         print(f"\n{'='*70}")
         print(f"Running benchmark on {len(tasks_to_run)} tasks")
+        if parallel > 1:
+            print(f"Parallel workers: {parallel}")
+            print("Note: timing metrics include contention between workers and are not")
+            print("comparable to a sequential run")
         print(f"{'='*70}\n")
 
         start_time = time.time()
 
-        for i, task in enumerate(tasks_to_run, 1):
-            print(f"\n[{i}/{len(tasks_to_run)}] Processing {task['id']}...")
+        if parallel > 1:
+            results = self._run_tasks_parallel(tasks_to_run, parallel)
+        else:
+            results = self._run_tasks_sequential(tasks_to_run)
+
+        total_duration = time.time() - start_time
+        self.parallel = parallel
+
+        print(f"\n{'='*70}")
+        print(f"Benchmark complete! Processed {len(results)} tasks in {total_duration:.1f}s")
+        print(f"{'='*70}\n")
+
+        self.results = results
+        return results
+
+    def _run_tasks_sequential(self, tasks: List[Dict[str, Any]]) -> List[ComparisonMetrics]:
+        """Run tasks one after another in this process"""
+        from baseline_agent import BaselineAgent
+        from cs_hybrid_agent import CSHybridAgent
+
+        baseline_agent = BaselineAgent(self.repo_path, verbose=self.verbose)
+        cs_agent = CSHybridAgent(self.repo_path, verbose=self.verbose)
+
+        results = []
+        for i, task in enumerate(tasks, 1):
+            print(f"\n[{i}/{len(tasks)}] Processing {task['id']}...")
 
             try:
                 metrics = self.run_single_task(task, baseline_agent, cs_agent)
@@ -230,66 +319,87 @@ class TestRunner:
                 print(f"ERROR processing {task['id']}: {e}")
                 continue
 
-        total_duration = time.time() - start_time
+        return results
 
-        print(f"\n{'='*70}")
-        print(f"Benchmark complete! Processed {len(results)} tasks in {total_duration:.1f}s")
-        print(f"{'='*70}\n")
+    def _run_tasks_parallel(
+        self,
+        tasks: List[Dict[str, Any]],
+        parallel: int
+    ) -> List[ComparisonMetrics]:
+        """
+        Run tasks across a process pool, preserving task order in the results.
+        Each worker runs one agent at a time, so at most `parallel` agents
+        (and cs searches) run at once.
+        """
+        indexed_results = []
+        with ProcessPoolExecutor(
+            max_workers=parallel,
+            initializer=_worker_init,
+            initargs=(str(self.repo_path), self.verbose)
+        ) as executor:
+            futures = {
+                executor.submit(_run_task_worker, task): (i, task)
+                for i, task in enumerate(tasks)
+            }
 
-        self.results = results
-        return results
+            for done, future in enumerate(as_completed(futures), 1):
+                i, task = futures[future]
+                try:
+                    metrics = future.result()
+                except Exception as e:
+                    print(f"ERROR processing {task['id']}: {e}")
+                    continue
+
+                print(f"[{done}/{len(tasks)}] Completed {task['id']}")
+                indexed_results.append((i, metrics))
+
+        indexed_results.sort(key=lambda item: item[0])
+        return [metrics for _, metrics in indexed_results]
 
     def generate_summary_report(self) -> Dict[str, Any]:
         """Generate summary statistics"""
+        import numpy as np
 
         if not self.results:
             return {}
 
-        # Overall improvements
-        call_reductions = [m.call_reduction_pct for m in self.results]
-        token_reductions = [m.token_reduction_pct for m in self.results]
-        time_reductions = [m.time_reduction_pct for m in self.results]
-
-        # Success rates
-        baseline_successes = sum(1 for m in self.results if m.baseline_success)
-        cs_successes = sum(1 for m in self.results if m.cs_success)
-
-        # Precision/Recall
-        baseline_precision = statistics.mean(m.baseline_precision for m in self.results)
-        cs_precision = statistics.mean(m.cs_precision for m in self.results)
-        baseline_recall = statistics.mean(m.baseline_recall for m in self.results)
-        cs_recall = statistics.mean(m.cs_recall for m in self.results)
-
-        # By category
-        categories = {}
-        for metric in self.results:
-            cat = metric.task_category
-            if cat not in categories:
-                categories[cat] = []
-            categories[cat].append(metric)
-
-        category_summary = {}
-        for cat, metrics in categories.items():
-            category_summary[cat] = {
-                'count': len(metrics),
-                'avg_call_reduction': statistics.mean(m.call_reduction_pct for m in metrics),
-                'avg_token_reduction': statistics.mean(m.token_reduction_pct for m in metrics),
-                'cs_success_rate': sum(1 for m in metrics if m.cs_success) / len(metrics)
-            }
+        # One pass over the results into an (n_tasks, 9) float matrix
+        # (booleans stored as 0.0/1.0), then every column reduced in one call
+        arr = np.array(
+            [
+                (m.call_reduction_pct, m.token_reduction_pct, m.time_reduction_pct,
+                 m.baseline_precision, m.cs_precision, m.baseline_recall, m.cs_recall,
+                 m.baseline_success, m.cs_success)
+                for m in self.results
+            ],
+            dtype=np.float64
+        )
+        (avg_call_reduction, avg_token_reduction, avg_time_reduction,
+         baseline_precision, cs_precision, baseline_recall, cs_recall,
+         baseline_success_rate, cs_success_rate) = arr.mean(axis=0).tolist()
+        median_call_reduction, median_token_reduction = np.median(
+            arr[:, [_COL_CALL_REDUCTION, _COL_TOKEN_REDUCTION]], axis=0
+        ).tolist()
+
+        category_summary = self._summarize_by_category(
+            [m.task_category for m in self.results], arr
+        )
 
         summary = {
             'total_tasks': len(self.results),
+            'parallel_workers': self.parallel,
+            'timing_comparable': self.parallel == 1,
             'overall_improvements': {
-                'avg_call_reduction_pct': statistics.mean(call_reductions),
-                'median_call_reduction_pct': statistics.median(call_reductions),
-                'avg_token_reduction_pct': statistics.mean(token_reductions),
-                'median_token_reduction_pct': statistics.median(token_reductions),
-                'avg_time_reduction_pct': statistics.mean(time_reductions),
+                'avg_call_reduction_pct': avg_call_reduction,
+                'median_call_reduction_pct': median_call_reduction,
+                'avg_token_reduction_pct': avg_token_reduction,
+                'median_token_reduction_pct': median_token_reduction,
+                'avg_time_reduction_pct': avg_time_reduction,
             },
             'success_rates': {
-                'baseline': baseline_successes / len(self.results),
-                'cs_hybrid': cs_successes / len(self.results),
-                'improvement': (cs_successes - baseline_successes) / len(self.results)
+                'baseline': baseline_success_rate,
+                'cs_hybrid': cs_success_rate,
+                'improvement': cs_success_rate - baseline_success_rate
             },
             'precision_recall': {
                 'baseline_precision': baseline_precision,
@@ -304,6 +414,63 @@ class TestRunner:
 
         return summary
 
+    @staticmethod
+    def _summarize_by_category(categories: List[str], arr) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-category counts and averages from the summary matrix, in order of
+        first appearance. Uses a pandas groupby when pandas is installed (the
+        'viz' extra), otherwise a single numpy bincount pass.
+        """
+        import numpy as np
+
+        call = arr[:, _COL_CALL_REDUCTION]
+        token = arr[:, _COL_TOKEN_REDUCTION]
+        cs_success = arr[:, _COL_CS_SUCCESS]
+
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+
+        if pd is not None:
+            grouped = pd.DataFrame({
+                'category': categories,
+                'call': call,
+                'token': token,
+                'cs_success': cs_success,
+            }).groupby('category', sort=False).agg(
+                count=('call', 'size'),
+                avg_call_reduction=('call', 'mean'),
+                avg_token_reduction=('token', 'mean'),
+                cs_success_rate=('cs_success', 'mean'),
+            )
+            return {
+                str(cat): {
+                    'count': int(row['count']),
+                    'avg_call_reduction': float(row['avg_call_reduction']),
+                    'avg_token_reduction': float(row['avg_token_reduction']),
+                    'cs_success_rate': float(row['cs_success_rate'])
+                }
+                for cat, row in grouped.iterrows()
+            }
+
+        unique, first_seen, inverse, counts = np.unique(
+            categories, return_index=True, return_inverse=True, return_counts=True
+        )
+        call_sums = np.bincount(inverse, weights=call)
+        token_sums = np.bincount(inverse, weights=token)
+        cs_success_sums = np.bincount(inverse, weights=cs_success)
+
+        return {
+            str(unique[c]): {
+                'count': int(counts[c]),
+                'avg_call_reduction': float(call_sums[c] / counts[c]),
+                'avg_token_reduction': float(token_sums[c] / counts[c]),
+                'cs_success_rate': float(cs_success_sums[c] / counts[c])
+            }
+            for c in np.argsort(first_seen)
+        }
+
     def print_summary(self, summary: Dict[str, Any]):
         """Pretty print summary report"""
 
@@ -320,6 +487,9 @@ class TestRunner:
         print(f"  Average token reduction: {improvements['avg_token_reduction_pct']:.1f}%")
         print(f"  Median token reduction: {improvements['median_token_reduction_pct']:.1f}%")
         print(f"  Average time reduction: {improvements['avg_time_reduction_pct']:.1f}%")
+        if not summary.get('timing_comparable', True):
+            print(f"    (ran with {summary['parallel_workers']} parallel workers: timings include")
+            print(f"     contention and are not comparable to a sequential run)")
 
         print(f"\n--- Success Rates ---")
         success = summary['success_rates']
@@ -339,12 +509,44 @@ class TestRunner:
         print(f"\n--- By Category ---")
         for cat, stats in summary['by_category'].items():
             print(f"\n  {cat} ({stats['count']} tasks):")
-            print(f"    Avg call reduction: {stats['avg_call_reduction_pct']:.1f}%")
-            print(f"    Avg token reduction: {stats['avg_token_reduction_pct']:.1f}%")
+            print(f"    Avg call reduction: {stats['avg_call_reduction']:.1f}%")
+            print(f"    Avg token reduction: {stats['avg_token_reduction']:.1f}%")
             print(f"    CS success rate: {stats['cs_success_rate']:.1%}")
 
         print(f"\n{'='*70}\n")
 
+    @staticmethod
+    def _metrics_to_dict(m: ComparisonMetrics) -> Dict[str, Any]:
+        """JSON layout of a single task's comparison in detailed_results.json"""
+        return {
+            'task_id': m.task_id,
+            'category': m.task_category,
+            'difficulty': m.task_difficulty,
+            'baseline': {
+                'calls': m.baseline_calls,
+                'tokens': m.baseline_tokens,
+                'duration': m.baseline_duration,
+                'precision': m.baseline_precision,
+                'recall': m.baseline_recall,
+                'success': m.baseline_success
+            },
+            'cs_hybrid': {
+                'calls': m.cs_calls,
+                'tokens': m.cs_tokens,
+                'duration': m.cs_duration,
+                'precision': m.cs_precision,
+                'recall': m.cs_recall,
+                'success': m.cs_success
+            },
+            'improvements': {
+                'call_reduction_pct': m.call_reduction_pct,
+                'token_reduction_pct': m.token_reduction_pct,
+                'time_reduction_pct': m.time_reduction_pct,
+                'precision_improvement': m.precision_improvement,
+                'recall_improvement': m.recall_improvement
+            }
+        }
+
     def save_results(self, output_dir: Path):
         """Save detailed results and summary to JSON"""
 
@@ -352,44 +554,20 @@ class TestRunner:
 
         # Save detailed metrics
         detailed_file = output_dir / "detailed_results.json"
-        with open(detailed_file, 'w') as f:
-            json.dump([
-                {
-                    'task_id': m.task_id,
-                    'category': m.task_category,
-                    'difficulty': m.task_difficulty,
-                    'baseline': {
-                        'calls': m.baseline_calls,
-                        'tokens': m.baseline_tokens,
-                        'duration': m.baseline_duration,
-                        'precision': m.baseline_precision,
-                        'recall': m.baseline_recall,
-                        'success': m.baseline_success
-                    },
-                    'cs_hybrid': {
-                        'calls': m.cs_calls,
-                        'tokens': m.cs_tokens,
-                        'duration': m.cs_duration,
-                        'precision': m.cs_precision,
-                        'recall': m.cs_recall,
-                        'success': m.cs_success
-                    },
-                    'improvements': {
-                        'call_reduction_pct': m.call_reduction_pct,
-                        'token_reduction_pct': m.token_reduction_pct,
-                        'time_reduction_pct': m.time_reduction_pct,
-                        'precision_improvement': m.precision_improvement,
-                        'recall_improvement': m.recall_improvement
-                    }
-                }
-                for m in self.results
-            ], f, indent=2)
+        # Stream one record at a time rather than materializing the whole list
+        with open(detailed_file, 'wb') as f:
+            f.write(b"[\n")
+            for i, m in enumerate(self.results):
+                if i:
+                    f.write(b",\n")
+                f.write(dumps_json(self._metrics_to_dict(m)))
+            f.write(b"\n]\n")
 
         # Save summary
         summary = self.generate_summary_report()
         summary_file = output_dir / "summary_report.json"
-        with open(summary_file, 'w') as f:
-            json.dump(summary, f, indent=2)
+        with open(summary_file, 'wb') as f:
+            f.write(dumps_json(summary))
 
         print(f"Results saved to:")
         print(f"  Detailed: {detailed_file}")
@@ -427,6 +605,14 @@ def main():
         choices=['easy', 'medium', 'hard', 'very_hard'],
         help='Run only tasks of specific difficulty'
     )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Number of tasks to run concurrently (default: 1 = sequential). '
+             'Timing metrics are not comparable when N > 1'
+    )
 
     args = parser.parse_args()
 
@@ -435,17 +621,22 @@ def main():
     runner = TestRunner(args.repo, verbose=args.verbose)
     tasks = runner.load_tasks(tasks_file)
 
-    # Filter tasks
-    if args.category:
-        tasks = [t for t in tasks if t.get('category') == args.category]
-        print(f"Filtered to {len(tasks)} tasks in category: {args.category}")
-
-    if args.difficulty:
-        tasks = [t for t in tasks if t.get('difficulty') == args.difficulty]
-        print(f"Filtered to {len(tasks)} tasks with difficulty: {args.difficulty}")
+    # Filter tasks in a single pass
+    if args.category or args.difficulty:
+        tasks = [
+            t for t in tasks
+            if (not args.category or t.get('category') == args.category)
+            and (not args.difficulty or t.get('difficulty') == args.difficulty)
+        ]
+        filters = []
+        if args.category:
+            filters.append(f"category: {args.category}")
+        if args.difficulty:
+            filters.append(f"difficulty: {args.difficulty}")
+        print(f"Filtered to {len(tasks)} tasks with {', '.join(filters)}")
 
     # Run benchmark
-    results = runner.run_all_tasks(tasks, max_tasks=args.max_tasks)
+    results = runner.run_all_tasks(tasks, max_tasks=args.max_tasks, parallel=args.parallel)
 
     # Generate and print summary
     summary = runner.generate_summary_report()
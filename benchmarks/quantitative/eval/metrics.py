@@ -16,21 +16,18 @@ Plus cs-specific metrics:
 """
 
 import numpy as np
-from typing import List, Dict, Set, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, NamedTuple, Set, Tuple
 
 
-@dataclass
-class SearchResult:
-    """Single search result"""
+class SearchResult(NamedTuple):
+    """Single search result (immutable; relevance is tracked in arrays)"""
     doc_id: str
     score: float
     rank: int
     relevant: bool = False
 
 
-@dataclass
-class EvaluationResult:
+class EvaluationResult(NamedTuple):
     """Complete evaluation results for a query"""
     query_id: str
     precision_at_1: float
@@ -42,6 +39,90 @@ class EvaluationResult:
     average_precision: float
 
 
+# DCG discounts 1 / log2(i + 1) for ranks i = 1..9999, indexed by rank - 1.
+# Grown on demand by _discounts() when a cutoff exceeds the table.
+_DISCOUNT = 1.0 / np.log2(np.arange(2, 10001, dtype=np.float64))
+
+
+def _relevance_array(results: List[SearchResult]) -> np.ndarray:
+    """Boolean relevance flags of results, in rank order"""
+    return np.fromiter((r.relevant for r in results), dtype=bool, count=len(results))
+
+
+def _distinct_hits(rel: np.ndarray, results: List[SearchResult]) -> np.ndarray:
+    """rel with repeat occurrences of a doc_id cleared: each relevant doc counts once"""
+    hit_positions = np.flatnonzero(rel)
+    if hit_positions.size < 2:
+        return rel
+    distinct = rel.copy()
+    seen = set()
+    for i in hit_positions.tolist():
+        doc_id = results[i].doc_id
+        if doc_id in seen:
+            distinct[i] = False
+        else:
+            seen.add(doc_id)
+    return distinct
+
+
+def _discounts(n: int) -> np.ndarray:
+    """DCG discounts for ranks 1..n"""
+    global _DISCOUNT
+    if n > _DISCOUNT.size:
+        _DISCOUNT = 1.0 / np.log2(np.arange(2, n + 2, dtype=np.float64))
+    return _DISCOUNT[:n]
+
+
+# Array kernels: `rel` is the boolean relevance array of a ranked result list
+
+def _precision(rel: np.ndarray, k: int) -> float:
+    if rel.size == 0 or k == 0:
+        return 0.0
+    return int(rel[:k].sum()) / k
+
+
+def _recall(rel: np.ndarray, k: int, total_relevant: int) -> float:
+    if rel.size == 0 or k == 0 or total_relevant == 0:
+        return 0.0
+    return int(rel[:k].sum()) / total_relevant
+
+
+def _reciprocal_rank(rel: np.ndarray, results: List[SearchResult]) -> float:
+    if not rel.any():
+        return 0.0
+    # argmax finds the first relevant result; its own rank is what counts
+    return 1.0 / results[int(rel.argmax())].rank
+
+
+def _dcg(rel: np.ndarray, k: int) -> float:
+    if rel.size == 0 or k == 0:
+        return 0.0
+    top_k = rel[:k]
+    return float(_discounts(top_k.size)[top_k].sum())
+
+
+def _ndcg(rel: np.ndarray, k: int, total_relevant: int) -> float:
+    if rel.size == 0 or k == 0 or total_relevant == 0:
+        return 0.0
+
+    # Ideal DCG (all relevant docs at top positions) depends only on min(k, R)
+    ideal_dcg = float(_discounts(min(k, total_relevant)).sum())
+    if ideal_dcg == 0:
+        return 0.0
+
+    return _dcg(rel, k) / ideal_dcg
+
+
+def _average_precision(rel: np.ndarray, total_relevant: int) -> float:
+    # rel must come from _distinct_hits, so repeats of a doc don't count again
+    if rel.size == 0 or total_relevant == 0:
+        return 0.0
+    # Only ranks holding a relevant doc contribute; stop once all are found
+    hit_ranks = np.flatnonzero(rel)[:total_relevant] + 1
+    precisions = np.arange(1, hit_ranks.size + 1) / hit_ranks
+    return float(precisions.sum()) / total_relevant
+
+
 def precision_at_k(results: List[SearchResult], k: int) -> float:
     """
     Calculate Precision@k
@@ -55,13 +136,7 @@ def precision_at_k(results: List[SearchResult], k: int) -> float:
     Returns:
         Precision@k score
     """
-    if not results or k == 0:
-        return 0.0
-
-    top_k = results[:k]
-    relevant_count = sum(1 for r in top_k if r.relevant)
-
-    return relevant_count / k
+    return _precision(_relevance_array(results), k)
 
 
 def recall_at_k(
@@ -82,13 +157,7 @@ def recall_at_k(
     Returns:
         Recall@k score
     """
-    if not results or k == 0 or total_relevant == 0:
-        return 0.0
-
-    top_k = results[:k]
-    relevant_count = sum(1 for r in top_k if r.relevant)
-
-    return relevant_count / total_relevant
+    return _recall(_relevance_array(results), k, total_relevant)
 
 
 def mean_reciprocal_rank(results: List[SearchResult]) -> float:
@@ -103,14 +172,7 @@ def mean_reciprocal_rank(results: List[SearchResult]) -> float:
     Returns:
         MRR score (0 if no relevant docs found)
     """
-    if not results:
-        return 0.0
-
-    for result in results:
-        if result.relevant:
-            return 1.0 / result.rank
-
-    return 0.0  # No relevant documents found
+    return _reciprocal_rank(_relevance_array(results), results)
 
 
 def discounted_cumulative_gain(results: List[SearchResult], k: int) -> float:
@@ -126,15 +188,7 @@ def discounted_cumulative_gain(results: List[SearchResult], k: int) -> float:
     Returns:
         DCG@k score
     """
-    if not results or k == 0:
-        return 0.0
-
-    dcg = 0.0
-    for i, result in enumerate(results[:k], start=1):
-        relevance = 1.0 if result.relevant else 0.0
-        dcg += relevance / np.log2(i + 1)
-
-    return dcg
+    return _dcg(_relevance_array(results), k)
 
 
 def normalized_dcg(
@@ -157,23 +211,7 @@ def normalized_dcg(
     Returns:
         nDCG@k score (0 if no relevant docs)
     """
-    if not results or k == 0 or total_relevant == 0:
-        return 0.0
-
-    # Calculate actual DCG
-    actual_dcg = discounted_cumulative_gain(results, k)
-
-    # Calculate ideal DCG (all relevant docs at top positions)
-    ideal_results = [
-        SearchResult(doc_id=f"ideal_{i}", score=1.0, rank=i, relevant=True)
-        for i in range(1, min(k, total_relevant) + 1)
-    ]
-    ideal_dcg = discounted_cumulative_gain(ideal_results, k)
-
-    if ideal_dcg == 0:
-        return 0.0
-
-    return actual_dcg / ideal_dcg
+    return _ndcg(_relevance_array(results), k, total_relevant)
 
 
 def average_precision(results: List[SearchResult], total_relevant: int) -> float:
@@ -182,6 +220,8 @@ def average_precision(results: List[SearchResult], total_relevant: int) -> float
 
     AP = (sum of P@k for each relevant doc) / total_relevant
 
+    A doc_id listed more than once counts as relevant only at its first rank.
+
     Args:
         results: List of search results (sorted by rank)
         total_relevant: Total number of relevant documents
@@ -189,20 +229,7 @@ def average_precision(results: List[SearchResult], total_relevant: int) -> float
     Returns:
         AP score
     """
-    if not results or total_relevant == 0:
-        return 0.0
-
-    sum_precisions = 0.0
-    relevant_count = 0
-
-    for i, result in enumerate(results, start=1):
-        if result.relevant:
-            relevant_count += 1
-            # Precision at this position
-            precision_at_i = relevant_count / i
-            sum_precisions += precision_at_i
-
-    return sum_precisions / total_relevant
+    return _average_precision(_distinct_hits(_relevance_array(results), results), total_relevant)
 
 
 def mean_average_precision(
@@ -221,34 +248,36 @@ def mean_average_precision(
     Returns:
         MAP score
     """
-    if not all_results:
+    # Only queries with relevance judgments contribute to the mean
+    judged = [
+        (results, frozenset(relevance_judgments[query_id]))
+        for query_id, results in all_results.items()
+        if relevance_judgments.get(query_id)
+    ]
+    if not judged:
         return 0.0
 
-    ap_scores = []
-
-    for query_id, results in all_results.items():
-        relevant_docs = relevance_judgments.get(query_id, set())
-        if not relevant_docs:
-            continue
-
-        # Mark relevant results
-        marked_results = [
-            SearchResult(
-                doc_id=r.doc_id,
-                score=r.score,
-                rank=r.rank,
-                relevant=(r.doc_id in relevant_docs)
-            )
-            for r in results
-        ]
-
-        ap = average_precision(marked_results, len(relevant_docs))
-        ap_scores.append(ap)
+    # Padded relevance matrix R[q, i]: is the i-th result of query q relevant?
+    maxlen = max(len(results) for results, _ in judged)
+    rel = np.zeros((len(judged), maxlen), dtype=bool)
+    totals = np.empty(len(judged), dtype=np.float64)
+    for q, (results, relevant_docs) in enumerate(judged):
+        rel[q, :len(results)] = _distinct_hits(
+            np.fromiter(
+                (r.doc_id in relevant_docs for r in results), dtype=bool, count=len(results)
+            ),
+            results
+        )
+        totals[q] = len(relevant_docs)
 
-    if not ap_scores:
-        return 0.0
+    # AP for every query at once: precision at each rank, summed over relevant
+    # ranks up to the point where all of the query's relevant docs are found
+    found = rel.cumsum(axis=1)
+    counted = rel & (found <= totals[:, None])
+    precisions = found / np.arange(1, maxlen + 1)
+    ap_scores = (precisions * counted).sum(axis=1) / totals
 
-    return np.mean(ap_scores)
+    return float(ap_scores.mean())
 
 
 def evaluate_query(
@@ -265,28 +294,23 @@ def evaluate_query(
     Returns:
         EvaluationResult with all metrics
     """
-    # Mark relevant results
-    marked_results = [
-        SearchResult(
-            doc_id=r.doc_id,
-            score=r.score,
-            rank=r.rank,
-            relevant=(r.doc_id in relevant_docs)
-        )
-        for r in results
-    ]
-
-    total_relevant = len(relevant_docs)
+    # Relevance flags as a bool array alongside the original results: one hash
+    # lookup per result against a single frozen set, no re-marked copies
+    relevant = frozenset(relevant_docs)
+    rel = np.fromiter(
+        (r.doc_id in relevant for r in results), dtype=bool, count=len(results)
+    )
+    total_relevant = len(relevant)
 
     return EvaluationResult(
         query_id=results[0].doc_id if results else "unknown",
-        precision_at_1=precision_at_k(marked_results, 1),
-        precision_at_5=precision_at_k(marked_results, 5),
-        precision_at_10=precision_at_k(marked_results, 10),
-        recall_at_10=recall_at_k(marked_results, 10, total_relevant),
-        mrr=mean_reciprocal_rank(marked_results),
-        ndcg_at_10=normalized_dcg(marked_results, 10, total_relevant),
-        average_precision=average_precision(marked_results, total_relevant)
+        precision_at_1=_precision(rel, 1),
+        precision_at_5=_precision(rel, 5),
+        precision_at_10=_precision(rel, 10),
+        recall_at_10=_recall(rel, 10, total_relevant),
+        mrr=_reciprocal_rank(rel, results),
+        ndcg_at_10=_ndcg(rel, 10, total_relevant),
+        average_precision=_average_precision(_distinct_hits(rel, results), total_relevant)
     )
 
 
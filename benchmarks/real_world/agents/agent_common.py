@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the benchmark agents and the test runner:
+- JSON serialization (orjson when installed)
+- streaming a tool process's output with a timeout
+- the mtime-validated LRU behind each agent's read_file
+"""
+
+import json
+import subprocess
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: pip install 'semcs-benchmarks[perf]'
+    orjson = None
+
+
+# Entries kept by each agent's read_file cache
+FILE_CACHE_SIZE = 256
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Serialize obj as indented JSON, using orjson when installed (unknown types via str)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str)
+    return json.dumps(obj, indent=2, default=str).encode()
+
+
+def stream_lines(process: subprocess.Popen, timeout: float) -> Optional[Tuple[List[bytes], int]]:
+    """
+    Read a process's stdout line by line as it is produced, without buffering
+    the whole output first. Lines stay undecoded bytes.
+
+    Returns:
+        (lines without their newline, output length in bytes), or None if the
+        process ran past timeout and was killed. A process that has already
+    exited by then is not timed out, only its remaining output is read.
+    """
+    timed_out = threading.Event()
+
+    def expire():
+        if process.poll() is None:
+            timed_out.set()
+            process.kill()
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    lines = []
+    length = 0
+    try:
+        for raw in process.stdout:
+            length += len(raw)
+            lines.append(raw.rstrip(b'\n'))
+        process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+
+    return None if timed_out.is_set() else (lines, length)
+
+
+class CachedFileReader:
+    """
+    Reads files under a repository root through an LRU keyed by
+    (filepath, limit). Entries are validated against the file's mtime, so a
+    cache hit costs one stat and an edited file is read again.
+    """
+
+    def __init__(self, root: Path, size: int = FILE_CACHE_SIZE):
+        self.root = root
+        self.size = size
+        # (filepath, limit) -> (st_mtime_ns, content)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[int, str]]" = OrderedDict()
+
+    def read(self, filepath: str, limit: int) -> str:
+        """Up to limit lines of a file (roughly: limit * 100 characters), or an error message"""
+        path = self.root / filepath
+        key = (filepath, limit)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == mtime_ns:
+                self._entries.move_to_end(key)
+                return cached[1]
+            with open(path, 'r') as f:
+                content = f.read(limit * 100)  # Rough line limit
+        except Exception as e:
+            return f"Error reading {filepath}: {e}"
+
+        self._entries[key] = (mtime_ns, content)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        return content
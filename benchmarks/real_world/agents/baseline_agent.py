@@ -8,14 +8,82 @@ Simulates a Coding Agent (like Claude Code) that only has access to:
 - read for file reading
 
 This is the control group for measuring cs --hybrid's efficiency gains.
+
+Some searches are emulated in-process rather than run as real processes:
+literal text searches over *.rs files, the literal patterns of multi-pattern
+greps, and file-name globs (regex patterns always run rg itself). Their
+ToolCalls keep the args and output size of the equivalent rg/find call, but
+are recorded under the tool names "rg:in-process" and "find:in-process", so
+their durations are not mistaken for those of the real tools.
 """
 
+import fnmatch
+import mmap
+import os
+import re
 import subprocess
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from pathlib import Path
-import json
+
+from agent_common import CachedFileReader, dumps_json, stream_lines
+
+try:
+    import ahocorasick
+except ImportError:  # optional: pip install 'semcs-benchmarks[perf]'
+    ahocorasick = None
+
+
+# Tool names of ToolCalls for searches emulated in-process
+_RG_IN_PROCESS = "rg:in-process"
+_FIND_IN_PROCESS = "find:in-process"
+
+# Directories glob_search never descends into (find's `-not -path "*/<dir>/*"`)
+_GLOB_PRUNE = frozenset({"target", ".git", "node_modules"})
+
+# Characters that make a grep pattern a regex rather than a plain literal
+_REGEX_META = re.compile(r'[.^$*+?()\[\]{}|\\]')
+
+
+def _literal_matcher(literal: str):
+    """Substring test equivalent to a regex search for a metacharacter-free pattern"""
+    return lambda text: literal in text
+
+
+def _automaton_hits(automaton: "ahocorasick.Automaton", text: str, total: int) -> Set[str]:
+    """Distinct automaton words occurring in text (stops once all total are seen)"""
+    found = set()
+    for _, word in automaton.iter(text):
+        found.add(word)
+        if len(found) == total:
+            break
+    return found
+
+
+def _is_literal(pattern: str) -> bool:
+    """Does a grep pattern match only itself (no regex metacharacters)?"""
+    return not _REGEX_META.search(pattern)
+
+
+def _mmap_searcher(literals: List[str]) -> Callable[[mmap.mmap], bool]:
+    """
+    Predicate testing a mapped file for any of several literal patterns with
+    plain bytes finds (no regex engine at all)
+    """
+    needles = [literal.encode() for literal in literals]
+    return lambda mm: any(mm.find(needle) != -1 for needle in needles)
+
+
+def _file_matches(path: Path, search: Callable[[mmap.mmap], bool]) -> bool:
+    """Search a file without reading it into a Python object"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return search(mm)
+    except (OSError, ValueError):  # unreadable, or empty (cannot be mapped)
+        return False
 
 
 @dataclass
@@ -31,6 +99,16 @@ class ToolCall:
 @dataclass
 class AgentRun:
     """Record of complete agent execution on a task"""
+    # Fixed attribute set (no __dict__): assigning a misspelt field raises
+    # instead of silently adding it. Declared by hand as dataclass(slots=True)
+    # needs Python 3.10; fields must stay default-free for this to work.
+    __slots__ = (
+        'task_id', 'task_description', 'query',
+        'tool_calls', 'total_calls', 'total_duration', 'total_output_tokens',
+        'files_found', 'ground_truth_files', 'precision', 'recall', 'success',
+        'exploration_path',
+    )
+
     task_id: str
     task_description: str
     query: str
@@ -59,75 +137,274 @@ class BaselineAgent:
         self.repo_path = Path(repo_path)
         self.verbose = verbose
         self.tool_calls: List[ToolCall] = []
+        # Sum of output_tokens over tool_calls, kept as calls are recorded
+        self._running_token_total = 0
+        # Searches may be issued from worker threads; guards tool_calls
+        self._calls_lock = threading.Lock()
+        # Every *.rs file ripgrep would search, listed once per task (inside the
+        # first timed search) so *.rs searches run in-process instead of
+        # forking rg and re-walking the tree per call
+        self._rs_files: Optional[List[str]] = None
+        self._search_workers = min(8, os.cpu_count() or 1)
+        # (basename, "./path") of every file glob_search can see, walked once per task
+        self._all_files: Optional[List[Tuple[str, str]]] = None
+        # read_file results across tasks, revalidated by mtime
+        self._files = CachedFileReader(self.repo_path)
+
+    def _estimate_tokens(self, length: int) -> int:
+        """Estimate token count from output size in bytes (rough: ~4 bytes per token)"""
+        return length // 4
+
+    def _exec(self, tool: str, args: List[str]) -> Tuple[List[bytes], int]:
+        """
+        Execute a command, streaming its stdout.
 
-    def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough: ~4 chars per token)"""
-        return len(text) // 4
-
-    def _run_command(self, tool: str, args: List[str]) -> str:
-        """Execute a command and record metrics"""
-        start = time.time()
-
+        Returns:
+            (output lines as bytes, output length in bytes); ([], 0) if the
+            command fails to run or times out
+        """
         try:
-            result = subprocess.run(
+            process = subprocess.Popen(
                 [tool] + args,
                 cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                timeout=30
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=1024 * 1024
             )
-            output = result.stdout
-        except subprocess.TimeoutExpired:
-            output = ""
         except FileNotFoundError:
-            output = ""
+            return [], 0
+        return stream_lines(process, timeout=30) or ([], 0)
+
+    def _record_call(
+        self,
+        tool: str,
+        args: List[str],
+        start: float,
+        duration: float,
+        output_length: int
+    ):
+        """Record metrics for one (logical) tool invocation"""
+        tokens = self._estimate_tokens(output_length)
+
+        with self._calls_lock:
+            self.tool_calls.append(ToolCall(
+                tool=tool,
+                args=args,
+                timestamp=start,
+                duration=duration,
+                output_tokens=tokens
+            ))
+            self._running_token_total += tokens
 
-        duration = time.time() - start
-        tokens = self._estimate_tokens(output)
+        if self.verbose:
+            print(f"[{tool}] {' '.join(args)} -> {output_length} bytes, {tokens} tokens")
 
-        # Record tool call
-        self.tool_calls.append(ToolCall(
-            tool=tool,
-            args=args,
-            timestamp=start,
-            duration=duration,
-            output_tokens=tokens
-        ))
+    def _run_command(self, tool: str, args: List[str]) -> List[bytes]:
+        """Execute a command, record metrics and return its output lines"""
+        start = time.time()
+        lines, length = self._exec(tool, args)
+        self._record_call(tool, args, start, time.time() - start, length)
+        return lines
+
+    def _rs_files_cached(self) -> List[str]:
+        """List every *.rs file ripgrep would search, once per task"""
+        if self._rs_files is None:
+            self._rs_files = [
+                os.fsdecode(line.strip())
+                for line in self._exec("rg", ["--files"] + self._grep_filters("*.rs"))[0]
+                if line.strip()
+            ]
+        return self._rs_files
 
-        if self.verbose:
-            print(f"[{tool}] {' '.join(args)} -> {len(output)} chars, {tokens} tokens")
+    def _walk_cached(self) -> List[Tuple[str, str]]:
+        """
+        List every regular file under the repo once per task, in the order
+        find(1) would print them, pruning _GLOB_PRUNE directories.
 
-        return output
+        Returns:
+            (basename, "./relative/path") pairs
+        """
+        if self._all_files is None:
+            files = []
+
+            def walk(directory: str, prefix: str):
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in _GLOB_PRUNE:
+                                walk(entry.path, f"{prefix}{entry.name}/")
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append((entry.name, f"{prefix}{entry.name}"))
+
+            walk(str(self.repo_path), "./")
+            self._all_files = files
+        return self._all_files
 
     def glob_search(self, pattern: str) -> List[str]:
-        """Use find to search for files by pattern"""
-        output = self._run_command("find", [
-            ".",
-            "-type", "f",
-            "-name", pattern,
-            "-not", "-path", "*/target/*",
-            "-not", "-path", "*/.git/*",
-            "-not", "-path", "*/node_modules/*"
-        ])
+        """
+        Search for files by name pattern (simulates a find call).
 
-        files = [line.strip() for line in output.split('\n') if line.strip()]
+        The tree is walked in-process once per agent and matched with fnmatch
+        semantics; the ToolCall, recorded as "find:in-process", carries the
+        same args and output size the equivalent `find -name` would.
+        """
+        start = time.time()
+        matches = re.compile(fnmatch.translate(pattern)).match
+        files = [path for name, path in self._walk_cached() if matches(name)]
+        self._record_call(
+            _FIND_IN_PROCESS,
+            [
+                ".",
+                "-type", "f",
+                "-name", pattern,
+                "-not", "-path", "*/target/*",
+                "-not", "-path", "*/.git/*",
+                "-not", "-path", "*/node_modules/*"
+            ],
+            start,
+            time.time() - start,
+            sum(len(os.fsencode(path)) + 1 for path in files)
+        )
         return files
 
-    def grep_search(self, pattern: str, file_pattern: str = "*") -> List[str]:
-        """Use ripgrep to search for text pattern"""
-        output = self._run_command("rg", [
-            "--files-with-matches",
-            "--no-heading",
-            pattern,
+    @staticmethod
+    def _grep_filters(file_pattern: str) -> List[str]:
+        """ripgrep glob filters shared by all file searches"""
+        return [
             "--glob", file_pattern,
             "--glob", "!target/",
             "--glob", "!.git/",
             "--glob", "!node_modules/"
-        ])
+        ]
+
+    def _search_rs_files(self, search: Callable[[mmap.mmap], bool]) -> List[str]:
+        """Cached *.rs files for which search matches, in ripgrep's listing order"""
+        rs_files = self._rs_files_cached()
+        with ThreadPoolExecutor(max_workers=self._search_workers) as executor:
+            hits = executor.map(
+                lambda filepath: _file_matches(self.repo_path / filepath, search),
+                rs_files
+            )
+            return [filepath for filepath, hit in zip(rs_files, hits) if hit]
+
+    def grep_search(self, pattern: str, file_pattern: str = "*") -> List[str]:
+        """
+        Search for a text pattern (simulates a ripgrep call).
+
+        Literal *.rs searches scan the cached file list in-process via mmap (a
+        plain bytes find); the ToolCall, recorded as "rg:in-process", covers
+        just that scan and carries the same args and output size an
+        `rg --files-with-matches` call would. Regex patterns always run rg, so
+        they get its regex dialect.
+        """
+        if file_pattern == "*.rs" and _is_literal(pattern):
+            start = time.time()
+            files = self._search_rs_files(_mmap_searcher([pattern]))
+            self._record_call(
+                _RG_IN_PROCESS,
+                ["--files-with-matches", "--no-heading", pattern] + self._grep_filters(file_pattern),
+                start,
+                time.time() - start,
+                sum(len(os.fsencode(filepath)) + 1 for filepath in files)
+            )
+            return files
 
-        files = [line.strip() for line in output.split('\n') if line.strip()]
+        output = self._run_command(
+            "rg",
+            ["--files-with-matches", "--no-heading", pattern] + self._grep_filters(file_pattern)
+        )
+
+        # Only the path fields are ever decoded
+        files = [os.fsdecode(line.strip()) for line in output if line.strip()]
         return files
 
+    def _candidate_files(self, literals: List[str], file_pattern: str = "*") -> List[str]:
+        """
+        Shortlist files containing any of the literal patterns with one
+        ripgrep walk (`rg -l -e p1 -e p2 ...`).
+
+        For *.rs the cached file list is scanned in-process with plain bytes
+        finds, so no process is spawned at all.
+        """
+        if file_pattern == "*.rs":
+            shortlist = self._search_rs_files(_mmap_searcher(literals))
+        else:
+            args = ["--files-with-matches", "--no-heading"]
+            for literal in literals:
+                args += ["-e", literal]
+            output, _ = self._exec("rg", args + self._grep_filters(file_pattern))
+            shortlist = [os.fsdecode(line.strip()) for line in output if line.strip()]
+        return shortlist
+
+    def grep_search_multi(
+        self,
+        patterns: List[str],
+        file_pattern: str = "*"
+    ) -> Dict[str, List[str]]:
+        """
+        Search for several patterns, with a single ripgrep walk for all the
+        literal ones.
+
+        ripgrep only pre-filters: it shortlists the files containing any
+        literal, and each literal is then attributed to the (usually small)
+        shortlist in-process - a substring test (or, with pyahocorasick
+        installed, one Aho-Corasick pass per file covering all of them).
+        Shortlisted files are loaded one at a time and dropped once attributed,
+        so memory stays bounded by the largest file rather than growing with
+        the shortlist. One ToolCall is still recorded per literal, with the args
+        and output size grep_search would give, so call/token metrics are
+        unchanged; as no per-pattern rg runs, these are recorded as
+        "rg:in-process". Regex patterns each run their own rg (grep_search),
+        so they are matched by ripgrep's regex engine rather than Python's.
+
+        Returns:
+            Dict mapping each pattern to its matching files
+        """
+        literals = list(dict.fromkeys(pattern for pattern in patterns if _is_literal(pattern)))
+        matches: Dict[str, List[str]] = {literal: [] for literal in literals}
+
+        automaton = None
+        searched = [literal for literal in literals if literal]
+        if ahocorasick is not None and len(searched) > 1:
+            automaton = ahocorasick.Automaton()
+            for literal in searched:
+                automaton.add_word(literal, literal)
+            automaton.make_automaton()
+            matchers = {'': _literal_matcher('')} if '' in matches else {}
+        else:
+            matchers = {literal: _literal_matcher(literal) for literal in literals}
+
+        start = time.time()
+        if literals:
+            for filepath in self._candidate_files(literals, file_pattern):
+                try:
+                    text = (self.repo_path / filepath).read_text(encoding='utf-8', errors='replace')
+                except OSError:
+                    continue
+                if automaton is not None:
+                    for literal in _automaton_hits(automaton, text, len(searched)):
+                        matches[literal].append(filepath)
+                for literal, matcher in matchers.items():
+                    if matcher(text):
+                        matches[literal].append(filepath)
+
+        # Attribute the shared wall time evenly across the logical searches
+        literal_calls = sum(1 for pattern in patterns if _is_literal(pattern))
+        duration = (time.time() - start) / max(literal_calls, 1)
+        for pattern in patterns:
+            if not _is_literal(pattern):
+                matches[pattern] = self.grep_search(pattern, file_pattern)
+                continue
+            self._record_call(
+                _RG_IN_PROCESS,
+                ["--files-with-matches", "--no-heading", pattern] + self._grep_filters(file_pattern),
+                start,
+                duration,
+                sum(len(os.fsencode(filepath)) + 1 for filepath in matches[pattern])
+            )
+
+        return matches
+
     def grep_content(self, pattern: str, context: int = 2) -> str:
         """Use ripgrep to get content with context"""
         output = self._run_command("rg", [
@@ -138,16 +415,11 @@ class BaselineAgent:
             "--glob", "!target/",
             "--glob", "!.git/"
         ])
-        return output
+        return b"".join(line + b"\n" for line in output).decode(errors='replace')
 
     def read_file(self, filepath: str, limit: int = 1000) -> str:
         """Read a file (simulates Read tool)"""
-        try:
-            with open(self.repo_path / filepath, 'r') as f:
-                content = f.read(limit * 100)  # Rough line limit
-            return content
-        except Exception as e:
-            return f"Error reading {filepath}: {e}"
+        return self._files.read(filepath, limit)
 
     def execute_task(self, task: Dict[str, Any]) -> AgentRun:
         """
@@ -157,12 +429,18 @@ class BaselineAgent:
         without semantic understanding or AST awareness.
         """
         self.tool_calls = []
+        self._running_token_total = 0
+        # Like the cs agent, nothing carries over between tasks: each task
+        # pays for its own file listings, inside the searches that need them
+        self._rs_files = None
+        self._all_files = None
         start_time = time.time()
 
         task_id = task['id']
         description = task['task']
         query_en = task['query_en']
         ground_truth = task.get('ground_truth_files', [])
+        ground_truth_set = frozenset(ground_truth)
 
         files_found = set()
         exploration_path = []
@@ -178,30 +456,48 @@ class BaselineAgent:
         # This mimics how an agent without semantic search would iteratively explore
 
         keywords = query_en.split()
+        query_lower = query_en.lower()
+
+        # Every grep pattern this strategy issues is known up front, so they all
+        # go through one ripgrep walk; hits are then consumed phase by phase below
+        phase1_keywords = keywords[:3]  # Limit to avoid explosion
+        combined = " ".join(keywords[:2]) if len(keywords) >= 2 else None
+        patterns = list(phase1_keywords)
+        if combined:
+            patterns.append(combined)
+        if "error" in query_lower:
+            patterns.append(r"Result<")
+        if task.get('cross_file', False):
+            patterns.append(r"impl\s+")
+
+        # The config glob doesn't depend on any grep result, so it runs
+        # alongside the grep pass (the first glob walks the whole tree)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            config_glob = (
+                executor.submit(self.glob_search, "*config*.rs")
+                if "config" in query_lower else None
+            )
+            grep_hits = self.grep_search_multi(patterns, "*.rs")
 
         # Phase 1: Search for each keyword separately
-        for keyword in keywords[:3]:  # Limit to avoid explosion
+        for keyword in phase1_keywords:
             exploration_path.append(f"grep:{keyword}")
-            matches = self.grep_search(keyword, "*.rs")
-            files_found.update(matches[:5])  # Take top 5 per keyword
+            files_found.update(grep_hits[keyword][:5])  # Take top 5 per keyword
 
         # Phase 2: Try combined patterns
-        if len(keywords) >= 2:
-            combined = " ".join(keywords[:2])
+        if combined:
             exploration_path.append(f"grep:{combined}")
-            matches = self.grep_search(combined, "*.rs")
-            files_found.update(matches[:5])
+            files_found.update(grep_hits[combined][:5])
 
         # Phase 3: File pattern search if task mentions specific components
-        if "config" in query_en.lower():
+        if "config" in query_lower:
             exploration_path.append("glob:*config*.rs")
-            matches = self.glob_search("*config*.rs")
+            matches = config_glob.result()
             files_found.update(matches)
 
-        if "error" in query_en.lower():
+        if "error" in query_lower:
             exploration_path.append("grep:Result")
-            matches = self.grep_search(r"Result<", "*.rs")
-            files_found.update(matches[:5])
+            files_found.update(grep_hits[r"Result<"][:5])
 
         # Phase 4: Read some files to understand (context consumption!)
         for filepath in list(files_found)[:3]:  # Read first 3 files
@@ -213,21 +509,20 @@ class BaselineAgent:
         if task.get('cross_file', False):
             # Cross-file tasks require more exploration
             exploration_path.append("grep:impl")
-            impl_files = self.grep_search(r"impl\s+", "*.rs")
-            files_found.update(impl_files[:3])
+            files_found.update(grep_hits[r"impl\s+"][:3])
 
         # Calculate metrics
         total_duration = time.time() - start_time
-        total_calls = len(self.tool_calls)
-        total_tokens = sum(call.output_tokens for call in self.tool_calls)
+        # Hand this task's calls over to the AgentRun rather than copying them
+        tool_calls, self.tool_calls = self.tool_calls, []
+        total_calls = len(tool_calls)
+        total_tokens = self._running_token_total
 
         # Calculate precision/recall
         files_found_list = list(files_found)
-        ground_truth_set = set(ground_truth)
-        found_set = set(files_found_list)
 
-        true_positives = len(found_set & ground_truth_set)
-        precision = true_positives / len(found_set) if found_set else 0.0
+        true_positives = len(files_found & ground_truth_set)
+        precision = true_positives / len(files_found) if files_found else 0.0
         recall = true_positives / len(ground_truth_set) if ground_truth_set else 0.0
 
         # Success criteria: Find at least 70% of ground truth
@@ -237,7 +532,7 @@ class BaselineAgent:
             task_id=task_id,
             task_description=description,
             query=query_en,
-            tool_calls=self.tool_calls.copy(),
+            tool_calls=tool_calls,
             total_calls=total_calls,
             total_duration=total_duration,
             total_output_tokens=total_tokens,
@@ -319,8 +614,8 @@ def main():
     # Save results
     output_file = Path(__file__).parent.parent / "results" / "baseline_test.json"
     output_file.parent.mkdir(exist_ok=True)
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(dumps_json(results))
 
     print(f"\n\nResults saved to: {output_file}")
 
@@ -11,14 +11,32 @@ Simulates a Coding Agent (like Claude Code) enhanced with cs --hybrid:
 This is the treatment group demonstrating efficiency gains.
 """
 
+import os
 import subprocess
+import threading
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
-import json
 import re
 
+from agent_common import CachedFileReader, dumps_json, stream_lines
+
+
+# Phase 1 search parameters by task difficulty: (topk, threshold)
+_DIFFICULTY_PARAMS = {
+    'easy': (10, 0.70),
+    'medium': (15, 0.65),
+    'hard': (20, 0.60),
+    'very_hard': (25, 0.55),
+}
+
+# A cs result line: path/to/file.rs:line_number:content
+_CS_LINE_RE = re.compile(rb'^([^:]+):\d+:')
+
+# Per-process timeout in seconds (cs --hybrid may take longer than grep)
+_COMMAND_TIMEOUT = 60
+
 
 @dataclass
 class ToolCall:
@@ -33,6 +51,16 @@ class ToolCall:
 @dataclass
 class AgentRun:
     """Record of complete agent execution on a task"""
+    # Fixed attribute set (no __dict__): assigning a misspelt field raises
+    # instead of silently adding it. Declared by hand as dataclass(slots=True)
+    # needs Python 3.10; fields must stay default-free for this to work.
+    __slots__ = (
+        'task_id', 'task_description', 'query',
+        'tool_calls', 'total_calls', 'total_duration', 'total_output_tokens',
+        'files_found', 'ground_truth_files', 'precision', 'recall', 'success',
+        'exploration_path',
+    )
+
     task_id: str
     task_description: str
     query: str
@@ -54,6 +82,21 @@ class AgentRun:
     exploration_path: List[str]
 
 
+@dataclass
+class PendingCall:
+    """A spawned tool invocation awaiting completion"""
+    tool: str
+    args: List[str]
+    start: float
+    process: Optional[subprocess.Popen] = None
+    output: Optional[str] = None  # Set instead of process if spawning failed
+    # Thread draining process's stdout from spawn on, so concurrently spawned
+    # commands never block on a full pipe; it sets streamed and end
+    reader: Optional[threading.Thread] = None
+    streamed: Optional[Tuple[List[bytes], int]] = None
+    end: Optional[float] = None
+
+
 class CSHybridAgent:
     """Agent enhanced with cs --hybrid semantic search"""
 
@@ -61,34 +104,76 @@ class CSHybridAgent:
         self.repo_path = Path(repo_path)
         self.verbose = verbose
         self.tool_calls: List[ToolCall] = []
+        # Sum of output_tokens over tool_calls, kept as calls are recorded
+        self._running_token_total = 0
         self.cs_binary = "cs"  # Assume cs is in PATH
+        # read_file results across tasks, revalidated by mtime
+        self._files = CachedFileReader(self.repo_path)
 
-    def _estimate_tokens(self, text: str) -> int:
-        """Estimate token count (rough: ~4 chars per token)"""
-        return len(text) // 4
+    def _estimate_tokens(self, length: int) -> int:
+        """Estimate token count from output size in bytes (rough: ~4 bytes per token)"""
+        return length // 4
 
-    def _run_command(self, tool: str, args: List[str]) -> str:
-        """Execute a command and record metrics"""
+    def _spawn_command(self, tool: str, args: List[str]) -> PendingCall:
+        """Start a command without waiting for it to finish"""
         start = time.time()
 
         try:
-            result = subprocess.run(
+            process = subprocess.Popen(
                 [tool] + args,
                 cwd=self.repo_path,
-                capture_output=True,
-                text=True,
-                timeout=60  # cs --hybrid may take longer than grep
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # Include stderr for debugging
+                bufsize=1024 * 1024
             )
-            output = result.stdout + result.stderr  # Include stderr for debugging
-        except subprocess.TimeoutExpired:
-            output = "ERROR: Timeout"
         except FileNotFoundError:
-            output = f"ERROR: Command not found: {tool}"
-
-        duration = time.time() - start
-        tokens = self._estimate_tokens(output)
+            return PendingCall(tool, args, start, output=f"ERROR: Command not found: {tool}")
+
+        pending = PendingCall(tool, args, start, process=process)
+        pending.reader = threading.Thread(target=self._drain, args=(pending,), daemon=True)
+        pending.reader.start()
+        return pending
+
+    @staticmethod
+    def _drain(pending: PendingCall):
+        """Reader thread: stream a command's output until it exits or times out"""
+        pending.streamed = stream_lines(pending.process, _COMMAND_TIMEOUT)
+        pending.end = time.time()
+
+    def _collect_output(self, pending: PendingCall) -> Tuple[List[bytes], int]:
+        """Wait for a spawned command: (output lines as bytes, output length in bytes)"""
+        if pending.process is None:
+            output = pending.output.encode()
+            return [output], len(output)
+
+        pending.reader.join()
+        if pending.streamed is None:
+            return [b"ERROR: Timeout"], len(b"ERROR: Timeout")
+        return pending.streamed
+
+    @staticmethod
+    def _duration(pending: PendingCall) -> float:
+        """Seconds from spawn until the command finished (not until it was collected)"""
+        end = pending.end if pending.end is not None else time.time()
+        return end - pending.start
+
+    def _finish_command(self, pending: PendingCall) -> List[bytes]:
+        """Wait for a spawned command, record metrics and return its output lines"""
+        lines, length = self._collect_output(pending)
+        self._record_call(pending.tool, pending.args, pending.start, self._duration(pending), length)
+        return lines
+
+    def _record_call(
+        self,
+        tool: str,
+        args: List[str],
+        start: float,
+        duration: float,
+        output_length: int
+    ):
+        """Record metrics for one tool invocation"""
+        tokens = self._estimate_tokens(output_length)
 
-        # Record tool call
         self.tool_calls.append(ToolCall(
             tool=tool,
             args=args,
@@ -96,29 +181,30 @@ class CSHybridAgent:
             duration=duration,
             output_tokens=tokens
         ))
+        self._running_token_total += tokens
 
         if self.verbose:
-            print(f"[{tool}] {' '.join(args[:3])}... -> {len(output)} chars, {tokens} tokens")
+            print(f"[{tool}] {' '.join(args[:3])}... -> {output_length} bytes, {tokens} tokens")
 
-        return output
+    @staticmethod
+    def _cancel_command(pending: PendingCall):
+        """Kill a spawned command whose output is no longer needed (not recorded)"""
+        if pending.process is not None:
+            pending.process.kill()
+            pending.reader.join()
 
-    def cs_hybrid_search(
+    def _run_command(self, tool: str, args: List[str]) -> List[bytes]:
+        """Execute a command, record metrics and return its output lines"""
+        return self._finish_command(self._spawn_command(tool, args))
+
+    def _spawn_cs(
         self,
         query: str,
         topk: int = 15,
         rerank: bool = True,
         threshold: float = 0.65
-    ) -> List[str]:
-        """
-        Execute cs --hybrid search with semantic + lexical + AST fusion.
-
-        This is the key advantage: a single call that:
-        1. Understands semantic intent
-        2. Matches exact keywords (lexical)
-        3. Recognizes code structure (AST)
-        4. Fuses results with RRF
-        5. Optionally reranks for precision
-        """
+    ) -> PendingCall:
+        """Start a cs --hybrid search; collect it with _finish_cs()"""
         args = [
             "--hybrid",
             query,
@@ -135,31 +221,46 @@ class CSHybridAgent:
                 "--rerank-model", "jina-reranker-v2-base-multilingual"
             ])
 
-        output = self._run_command(self.cs_binary, args)
+        return self._spawn_command(self.cs_binary, args)
+
+    def _finish_cs(self, pending: PendingCall) -> List[str]:
+        """Wait for a cs --hybrid search and extract the matched file paths"""
+        output, length = self._collect_output(pending)
+        self._record_call(pending.tool, pending.args, pending.start, self._duration(pending), length)
 
-        # Parse output to extract file paths
+        # Parse output to extract file paths, deduplicated in first-seen order
         # Format: path/to/file.rs:line_number:content
-        files = []
-        seen = set()
-        for line in output.split('\n'):
+        files: Dict[str, None] = {}
+        for line in output:
             # Extract file path from output like "cs-cli/src/main.rs:123: code..."
-            match = re.match(r'^([^:]+):\d+:', line)
+            # (only the path is decoded, never the code content)
+            match = _CS_LINE_RE.match(line)
             if match:
-                filepath = match.group(1)
-                if filepath not in seen:
-                    files.append(filepath)
-                    seen.add(filepath)
+                files.setdefault(os.fsdecode(match.group(1)))
+        return list(files)
+
+    def cs_hybrid_search(
+        self,
+        query: str,
+        topk: int = 15,
+        rerank: bool = True,
+        threshold: float = 0.65
+    ) -> List[str]:
+        """
+        Execute cs --hybrid search with semantic + lexical + AST fusion.
 
-        return files
+        This is the key advantage: a single call that:
+        1. Understands semantic intent
+        2. Matches exact keywords (lexical)
+        3. Recognizes code structure (AST)
+        4. Fuses results with RRF
+        5. Optionally reranks for precision
+        """
+        return self._finish_cs(self._spawn_cs(query, topk, rerank, threshold))
 
     def read_file(self, filepath: str, limit: int = 500) -> str:
         """Read a file for deeper understanding (if needed)"""
-        try:
-            with open(self.repo_path / filepath, 'r') as f:
-                content = f.read(limit * 100)
-            return content
-        except Exception as e:
-            return f"Error reading {filepath}: {e}"
+        return self._files.read(filepath, limit)
 
     def execute_task(self, task: Dict[str, Any]) -> AgentRun:
         """
@@ -173,6 +274,7 @@ class CSHybridAgent:
         - Reranking for precision
         """
         self.tool_calls = []
+        self._running_token_total = 0
         start_time = time.time()
 
         task_id = task['id']
@@ -180,6 +282,7 @@ class CSHybridAgent:
         query_en = task['query_en']
         query_zh = task.get('query_zh', '')
         ground_truth = task.get('ground_truth_files', [])
+        ground_truth_set = frozenset(ground_truth)
         difficulty = task.get('difficulty', 'medium')
         is_iterative = task.get('iterative', False)
 
@@ -203,19 +306,7 @@ class CSHybridAgent:
         exploration_path.append(f"cs_hybrid:{multilingual_query[:50]}")
 
         # Adjust parameters based on task difficulty
-        topk = {
-            'easy': 10,
-            'medium': 15,
-            'hard': 20,
-            'very_hard': 25
-        }.get(difficulty, 15)
-
-        threshold = {
-            'easy': 0.70,
-            'medium': 0.65,
-            'hard': 0.60,
-            'very_hard': 0.55
-        }.get(difficulty, 0.65)
+        topk, threshold = _DIFFICULTY_PARAMS.get(difficulty, (15, 0.65))
 
         # Execute hybrid search
         matches = self.cs_hybrid_search(
@@ -226,34 +317,51 @@ class CSHybridAgent:
         )
         files_found.update(matches)
 
-        # Phase 2: Refinement for complex/iterative tasks
-        if is_iterative or difficulty in ['hard', 'very_hard']:
-            # For complex tasks, may need 1-2 additional focused queries
-            # But still dramatically fewer than baseline's 15-30 calls
-
-            # Extract key technical terms for refinement
-            if "config" in query_en.lower() and len(files_found) < 5:
-                exploration_path.append("cs_hybrid:config_refinement")
-                refined = self.cs_hybrid_search(
+        # The follow-up queries below don't depend on each other's output, only
+        # on how many files the earlier phases turned up. Spawn every one that
+        # can still apply so they run concurrently, then settle them in order;
+        # any the rules below end up skipping is killed and never recorded.
+        refining = is_iterative or difficulty in ['hard', 'very_hard']
+        spawned = {}
+        if refining and len(files_found) < 5:
+            if "config" in query_en.lower():
+                spawned['config'] = self._spawn_cs(
                     query="configuration load save UserConfig",
                     topk=10,
                     rerank=True,
                     threshold=0.70
                 )
-                files_found.update(refined)
-
-            if "error" in query_en.lower() and len(files_found) < 5:
-                exploration_path.append("cs_hybrid:error_refinement")
-                refined = self.cs_hybrid_search(
+            if "error" in query_en.lower():
+                spawned['error'] = self._spawn_cs(
                     query="error handling Result anyhow",
                     topk=10,
                     rerank=True,
                     threshold=0.70
                 )
-                files_found.update(refined)
+        if task.get('gradient_descent', False):
+            spawned['deep_dive'] = self._spawn_cs(
+                query=f"{query_en} implementation details",
+                topk=15,
+                rerank=True,
+                threshold=0.60
+            )
+
+        # Phase 2: Refinement for complex/iterative tasks
+        # For complex tasks, may need 1-2 additional focused queries
+        # But still dramatically fewer than baseline's 15-30 calls
+        if 'config' in spawned:
+            exploration_path.append("cs_hybrid:config_refinement")
+            files_found.update(self._finish_cs(spawned['config']))
+
+        if 'error' in spawned:
+            if len(files_found) < 5:
+                exploration_path.append("cs_hybrid:error_refinement")
+                files_found.update(self._finish_cs(spawned['error']))
+            else:
+                self._cancel_command(spawned['error'])
 
         # Phase 3: Gradient descent navigation for architecture tasks
-        if task.get('gradient_descent', False):
+        if 'deep_dive' in spawned:
             # Use scores as "gradients" to guide exploration
             # Read top-scored file to understand architecture
             if files_found:
@@ -265,26 +373,22 @@ class CSHybridAgent:
                 # (In real agent, would use LLM to extract key terms)
                 # For benchmark, use predefined refinement
                 exploration_path.append("cs_hybrid:architecture_deep_dive")
-                deep_dive = self.cs_hybrid_search(
-                    query=f"{query_en} implementation details",
-                    topk=15,
-                    rerank=True,
-                    threshold=0.60
-                )
-                files_found.update(deep_dive)
+                files_found.update(self._finish_cs(spawned['deep_dive']))
+            else:
+                self._cancel_command(spawned['deep_dive'])
 
         # Calculate metrics
         total_duration = time.time() - start_time
-        total_calls = len(self.tool_calls)
-        total_tokens = sum(call.output_tokens for call in self.tool_calls)
+        # Hand this task's calls over to the AgentRun rather than copying them
+        tool_calls, self.tool_calls = self.tool_calls, []
+        total_calls = len(tool_calls)
+        total_tokens = self._running_token_total
 
         # Calculate precision/recall
         files_found_list = list(files_found)
-        ground_truth_set = set(ground_truth)
-        found_set = set(files_found_list)
 
-        true_positives = len(found_set & ground_truth_set)
-        precision = true_positives / len(found_set) if found_set else 0.0
+        true_positives = len(files_found & ground_truth_set)
+        precision = true_positives / len(files_found) if files_found else 0.0
         recall = true_positives / len(ground_truth_set) if ground_truth_set else 0.0
 
         # Success criteria
@@ -298,7 +402,7 @@ class CSHybridAgent:
             task_id=task_id,
             task_description=description,
             query=multilingual_query,
-            tool_calls=self.tool_calls.copy(),
+            tool_calls=tool_calls,
             total_calls=total_calls,
             total_duration=total_duration,
             total_output_tokens=total_tokens,
@@ -319,7 +423,7 @@ class CSHybridAgent:
             'metrics': {
                 'total_calls': run.total_calls,
                 'total_duration': run.total_duration,
-                'total_output_tokens': run.total_tokens,
+                'total_output_tokens': run.total_output_tokens,
                 'precision': run.precision,
                 'recall': run.recall,
                 'success': run.success
@@ -379,8 +483,8 @@ def main():
     # Save results
     output_file = Path(__file__).parent.parent / "results" / "cs_hybrid_test.json"
     output_file.parent.mkdir(exist_ok=True)
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(dumps_json(results))
 
     print(f"\n\nResults saved to: {output_file}")
 
@@ -0,0 +1,110 @@
+"""
+Check the baseline agent's in-process search emulation against real tools:
+file sets from grep_search / grep_search_multi must match `rg -l`, and
+glob_search must match `find -name`.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "real_world" / "agents"))
+
+from baseline_agent import BaselineAgent  # noqa: E402
+
+requires_rg = pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep not installed")
+
+FILES = {
+    "src/lib.rs": "pub fn load_config() -> Result<Config, Error> {\n    todo!()\n}\n",
+    "src/error.rs": "impl\nDisplay for Error {}\n// error handling\n",
+    "src/model/user.rs": "pub struct User;\nimpl   User { fn new() {} }\n",
+    "src/empty.rs": "",
+    "src/notes.txt": "load_config in a text file\n",
+    "target/debug/gen.rs": "fn load_config() {}\n",
+    "config/app_config.rs": "// config loading\n",
+    "src/unicode.rs": "let naïve = load_config();\n",
+    "src/macros.rs": "load_config{ path }\n",
+}
+
+PATTERNS = [
+    "load_config",         # literal
+    "Result<",             # literal with regex-free punctuation
+    r"impl\s+",            # regex that Python's re could match across a newline
+    "fn (weird [regex",    # invalid regex
+    "load_config{",        # invalid for ripgrep, valid for Python's re
+    r"\p{Lu}\w+;",         # valid for ripgrep, invalid for Python's re
+    r"na\wve",             # \w is Unicode-aware in ripgrep
+    "error handling",      # literal with a space
+    r"pub (fn|struct)",    # alternation
+    "absent_identifier",   # no matches
+]
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    for name, text in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return tmp_path
+
+
+def rg_files(repo: Path, pattern: str, file_pattern: str = "*.rs"):
+    """Files real ripgrep reports for a pattern, as grep_search would invoke it"""
+    output = subprocess.run(
+        ["rg", "--files-with-matches", "--no-heading", "-e", pattern]
+        + BaselineAgent._grep_filters(file_pattern),
+        cwd=repo, capture_output=True
+    ).stdout
+    return {os.fsdecode(line) for line in output.splitlines() if line}
+
+
+@requires_rg
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_grep_search_matches_rg(repo: Path, pattern: str):
+    agent = BaselineAgent(str(repo))
+    assert set(agent.grep_search(pattern, "*.rs")) == rg_files(repo, pattern)
+
+
+@requires_rg
+def test_grep_search_multi_matches_rg(repo: Path):
+    agent = BaselineAgent(str(repo))
+    hits = agent.grep_search_multi(PATTERNS, "*.rs")
+    for pattern in PATTERNS:
+        assert set(hits[pattern]) == rg_files(repo, pattern), pattern
+
+
+@requires_rg
+def test_grep_search_multi_other_file_pattern(repo: Path):
+    agent = BaselineAgent(str(repo))
+    hits = agent.grep_search_multi(["load_config"], "*.txt")
+    assert set(hits["load_config"]) == rg_files(repo, "load_config", "*.txt")
+
+
+@requires_rg
+def test_emulated_calls_are_labelled(repo: Path):
+    agent = BaselineAgent(str(repo))
+    agent.grep_search_multi(["load_config", r"impl\s+", "error handling"], "*.rs")
+    agent.glob_search("*config*.rs")
+    # Regex patterns run real rg; only literal searches are emulated
+    assert [call.tool for call in agent.tool_calls] == [
+        "rg:in-process", "rg", "rg:in-process", "find:in-process"
+    ]
+
+
+@pytest.mark.skipif(shutil.which("find") is None, reason="find not available")
+@pytest.mark.parametrize("pattern", ["*config*.rs", "*.rs", "user.rs", "*.txt"])
+def test_glob_search_matches_find(repo: Path, pattern: str):
+    agent = BaselineAgent(str(repo))
+    output = subprocess.run(
+        ["find", ".", "-type", "f", "-name", pattern,
+         "-not", "-path", "*/target/*",
+         "-not", "-path", "*/.git/*",
+         "-not", "-path", "*/node_modules/*"],
+        cwd=repo, capture_output=True, text=True
+    ).stdout
+    assert set(agent.glob_search(pattern)) == set(output.split())
@@ -0,0 +1,61 @@
+"""
+Check how the cs hybrid agent collects concurrently spawned searches: each
+command's output is drained while others are awaited, and durations and
+timeouts are per command, not per collection order.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "real_world" / "agents"))
+
+import cs_hybrid_agent  # noqa: E402
+from cs_hybrid_agent import CSHybridAgent  # noqa: E402
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses a shebang script as cs")
+
+# Stands in for cs: sleeps for the seconds given as the query, then prints
+# the number of result lines given as --topk
+FAKE_CS = f"""#!{sys.executable}
+import sys, time
+args = sys.argv[1:]
+time.sleep(float(args[1]))
+lines = int(args[args.index("--topk") + 1])
+sys.stdout.write("".join(f"src/file{{i}}.rs:{{i}}: {{'x' * 200}}\\n" for i in range(lines)))
+"""
+
+
+@pytest.fixture
+def agent(tmp_path: Path) -> CSHybridAgent:
+    fake = tmp_path / "fake_cs"
+    fake.write_text(FAKE_CS)
+    fake.chmod(0o755)
+    agent = CSHybridAgent(str(tmp_path))
+    agent.cs_binary = str(fake)
+    return agent
+
+
+def test_large_outputs_do_not_block_each_other(agent: CSHybridAgent):
+    # ~200KB each: more than a pipe buffer holds
+    spawned = [agent._spawn_cs(query="0", topk=1000) for _ in range(3)]
+    time.sleep(0.5)
+    files = [agent._finish_cs(pending) for pending in reversed(spawned)]
+
+    assert all(len(found) == 1000 for found in files)
+    # Every command finished long before the first collection
+    assert all(call.duration < 0.5 for call in agent.tool_calls)
+
+
+def test_timeout_is_per_command(agent: CSHybridAgent, monkeypatch):
+    monkeypatch.setattr(cs_hybrid_agent, "_COMMAND_TIMEOUT", 1.0)
+    slow = agent._spawn_cs(query="5", topk=1)
+    fast = agent._spawn_cs(query="0", topk=1)
+
+    assert agent._finish_cs(slow) == []
+    # Collected after the slow command timed out, yet not a timeout itself
+    assert agent._finish_cs(fast) == ["src/file0.rs"]
+    assert agent.tool_calls[0].duration >= 1.0
+    assert agent.tool_calls[1].duration < 1.0
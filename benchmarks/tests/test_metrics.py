@@ -0,0 +1,174 @@
+"""
+Check the vectorized IR metrics against straightforward reference loops,
+including repeated doc_ids, unjudged / empty queries in MAP, and cutoffs
+beyond the precomputed DCG discount table.
+"""
+
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "quantitative" / "eval"))
+
+import metrics  # noqa: E402
+from metrics import SearchResult  # noqa: E402
+
+
+# Reference implementations: one result at a time, no numpy
+
+def ref_precision(results, k):
+    if not results or k == 0:
+        return 0.0
+    return sum(r.relevant for r in results[:k]) / k
+
+
+def ref_recall(results, k, total_relevant):
+    if not results or k == 0 or total_relevant == 0:
+        return 0.0
+    return sum(r.relevant for r in results[:k]) / total_relevant
+
+
+def ref_mrr(results):
+    for r in results:
+        if r.relevant:
+            return 1.0 / r.rank
+    return 0.0
+
+
+def ref_dcg(results, k):
+    return sum(1.0 / math.log2(i + 2) for i, r in enumerate(results[:k]) if r.relevant)
+
+
+def ref_ndcg(results, k, total_relevant):
+    if not results or k == 0 or total_relevant == 0:
+        return 0.0
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(k, total_relevant)))
+    return ref_dcg(results, k) / ideal
+
+
+def ref_average_precision(results, total_relevant):
+    if total_relevant == 0:
+        return 0.0
+    seen = set()
+    total = 0.0
+    for i, r in enumerate(results):
+        if not r.relevant or r.doc_id in seen:
+            continue
+        seen.add(r.doc_id)
+        total += len(seen) / (i + 1)
+        if len(seen) == total_relevant:
+            break
+    return total / total_relevant
+
+
+def ref_map(all_results, judgments):
+    scores = []
+    for query_id, results in all_results.items():
+        relevant = judgments.get(query_id)
+        if not relevant:
+            continue
+        marked = [r._replace(relevant=r.doc_id in relevant) for r in results]
+        scores.append(ref_average_precision(marked, len(relevant)))
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def random_query(rng, n_docs=12, max_len=20):
+    """Ranked results (with repeated doc_ids) and the query's relevant docs"""
+    docs = [f"doc{i}" for i in range(n_docs)]
+    relevant = set(rng.sample(docs, rng.randint(0, 6)))
+    results = [
+        SearchResult(doc_id, 1.0 / (rank + 1), rank + 1, doc_id in relevant)
+        for rank, doc_id in enumerate(rng.choices(docs, k=rng.randint(0, max_len)))
+    ]
+    return results, relevant
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_single_query_metrics_match_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        results, relevant = random_query(rng)
+        total = len(relevant)
+        for k in (0, 1, 5, 10, 25):
+            assert metrics.precision_at_k(results, k) == pytest.approx(ref_precision(results, k))
+            assert metrics.recall_at_k(results, k, total) == pytest.approx(ref_recall(results, k, total))
+            assert metrics.discounted_cumulative_gain(results, k) == pytest.approx(ref_dcg(results, k))
+            assert metrics.normalized_dcg(results, k, total) == pytest.approx(ref_ndcg(results, k, total))
+        assert metrics.mean_reciprocal_rank(results) == pytest.approx(ref_mrr(results))
+        assert metrics.average_precision(results, total) == pytest.approx(
+            ref_average_precision(results, total)
+        )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_evaluate_query_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        results, relevant = random_query(rng)
+        # evaluate_query judges relevance itself from relevant_docs
+        unmarked = [r._replace(relevant=False) for r in results]
+        evaluation = metrics.evaluate_query(unmarked, relevant)
+        total = len(relevant)
+        assert evaluation.precision_at_5 == pytest.approx(ref_precision(results, 5))
+        assert evaluation.recall_at_10 == pytest.approx(ref_recall(results, 10, total))
+        assert evaluation.mrr == pytest.approx(ref_mrr(results))
+        assert evaluation.ndcg_at_10 == pytest.approx(ref_ndcg(results, 10, total))
+        assert evaluation.average_precision == pytest.approx(ref_average_precision(results, total))
+
+
+def test_repeated_doc_counts_once_in_average_precision():
+    results = [
+        SearchResult("a", 0.9, 1, True),
+        SearchResult("a", 0.8, 2, True),
+        SearchResult("b", 0.7, 3, True),
+    ]
+    # The repeat of "a" neither adds a hit nor ends the search before "b"
+    assert metrics.average_precision(results, 2) == pytest.approx((1 / 1 + 2 / 3) / 2)
+    assert metrics.mean_average_precision({"q": results}, {"q": {"a", "b"}}) == pytest.approx(
+        (1 / 1 + 2 / 3) / 2
+    )
+
+
+def test_reciprocal_rank_uses_the_result_rank():
+    # Results from a later page: ranks don't start at 1
+    results = [SearchResult("a", 0.9, 11, False), SearchResult("b", 0.8, 12, True)]
+    assert metrics.mean_reciprocal_rank(results) == pytest.approx(1 / 12)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_mean_average_precision_matches_reference(seed):
+    rng = random.Random(seed)
+    all_results, judgments = {}, {}
+    for q in range(rng.randint(1, 15)):
+        results, relevant = random_query(rng)
+        all_results[f"q{q}"] = results
+        kind = rng.random()
+        if kind < 0.15:
+            continue  # unjudged query: left out of the mean
+        judgments[f"q{q}"] = set() if kind < 0.3 else relevant
+    assert metrics.mean_average_precision(all_results, judgments) == pytest.approx(
+        ref_map(all_results, judgments)
+    )
+
+
+def test_mean_average_precision_edge_cases():
+    judged_but_empty = {"q": []}
+    assert metrics.mean_average_precision({}, {}) == 0.0
+    assert metrics.mean_average_precision({"q": [SearchResult("a", 1.0, 1)]}, {}) == 0.0
+    assert metrics.mean_average_precision(judged_but_empty, {"q": set()}) == 0.0
+    # A judged query with no results scores 0 and still counts in the mean
+    assert metrics.mean_average_precision(
+        {"q": [], "r": [SearchResult("a", 1.0, 1)]}, {"q": {"a"}, "r": {"a"}}
+    ) == pytest.approx(0.5)
+
+
+def test_cutoff_beyond_discount_table():
+    n = metrics._DISCOUNT.size + 500
+    results = [SearchResult(f"doc{i}", 0.0, i + 1, i % 7 == 0) for i in range(n)]
+    total = sum(r.relevant for r in results)
+    k = n + 100
+    assert metrics.discounted_cumulative_gain(results, k) == pytest.approx(ref_dcg(results, k))
+    assert metrics.normalized_dcg(results, k, total) == pytest.approx(ref_ndcg(results, k, total))
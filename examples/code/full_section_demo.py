@@ -5,30 +5,86 @@ This file demonstrates various Python patterns for testing cc's search capabilit
 """
 
 import json
+import time
+import hashlib
+import hmac
 import logging
 import asyncio
-from typing import Dict, List, Optional, Union
+import itertools
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
 
 
 # Setup logging for error handling demonstration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Snowflake user IDs: milliseconds since this epoch (2020-01-01 UTC) << 22,
+# then a 10-bit worker ID << 12, then a 12-bit per-worker sequence
+SNOWFLAKE_EPOCH_MS = 1_577_836_800_000
 
-@dataclass
+# Processed user data kept per UserService (least recently used evicted)
+USER_CACHE_SIZE = 1024
+
+
+def _dumps(obj) -> str:
+    """Pretty-print obj as JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _password_digest(password: str) -> bytes:
+    return hashlib.sha256(password.encode()).digest()
+
+
+# Demo credentials, hashed once at import into a read-only table.
+# In real implementation, check against database - never hardcode credentials!
+VALID_USERS = MappingProxyType({
+    username: _password_digest(password)
+    for username, password in {
+        'admin': 'secret123',
+        'user': 'password',
+        'demo': 'demo123'
+    }.items()
+})
+
+
+def snowflake_id(worker_id: int, sequence: int) -> int:
+    """Build a 64-bit ID unique across workers from a worker's sequence number"""
+    timestamp = int(time.time() * 1000) - SNOWFLAKE_EPOCH_MS
+    return (timestamp << 22) | ((worker_id & 0x3FF) << 12) | (sequence & 0xFFF)
+
+
+@dataclass(init=False)
 class UserProfile:
     """User profile data structure"""
+    # Fixed attribute set (no per-instance __dict__). Declared by hand as
+    # dataclass(slots=True) needs Python 3.10; since slots can't have class
+    # defaults, the defaults live in __init__ instead.
+    __slots__ = ('user_id', 'username', 'email', 'is_active', 'metadata')
+    
     user_id: int
     username: str
     email: str
-    is_active: bool = True
-    metadata: Dict[str, Union[str, int]] = None
-
-    def __post_init__(self):
-        if self.metadata is None:
-            self.metadata = {}
+    is_active: bool
+    metadata: Dict[str, Union[str, int]]
+    
+    def __init__(self, user_id: int, username: str, email: str, is_active: bool = True,
+                 metadata: Optional[Dict[str, Union[str, int]]] = None):
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        self.metadata = {} if metadata is None else metadata
 
 
 class DatabaseConnection:
@@ -37,7 +93,15 @@ class DatabaseConnection:
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
         self.is_connected = False
-        self._users: Dict[int, UserProfile] = {}
+        self.query_count = 0
+        # User table stored column-wise; _rows maps user_id to a row index
+        self._rows: Dict[int, int] = {}
+        self._usernames: List[str] = []
+        self._emails: List[str] = []
+        self._active = bytearray()
+        self._metadata: List[Dict[str, Union[str, int]]] = []
+        # ID sequence of the user table, shared by every service using it
+        self._user_ids = itertools.count(1)
     
     async def connect(self):
         """Establish database connection with error handling"""
@@ -47,25 +111,52 @@ class DatabaseConnection:
             self.is_connected = True
             logger.info("Database connection established")
         except Exception as e:
-            logger.error(f"Failed to connect to database: {e}")
+            logger.error("Failed to connect to database: %s", e)
             raise ConnectionError("Unable to establish database connection")
     
+    def close(self):
+        """Close the database connection"""
+        self.is_connected = False
+    
     async def get_user(self, user_id: int) -> Optional[UserProfile]:
         """Retrieve user profile with error handling"""
         if not self.is_connected:
             raise RuntimeError("Database not connected")
         
+        self.query_count += 1
         try:
-            return self._users.get(user_id)
+            row = self._rows.get(user_id)
+            if row is None:
+                return None
+            return UserProfile(
+                user_id=user_id,
+                username=self._usernames[row],
+                email=self._emails[row],
+                is_active=bool(self._active[row]),
+                metadata=self._metadata[row]
+            )
         except KeyError:
-            logger.warning(f"User {user_id} not found")
+            logger.warning("User %s not found", user_id)
             return None
         except Exception as e:
-            logger.error(f"Error retrieving user {user_id}: {e}")
+            logger.error("Error retrieving user %s: %s", user_id, e)
             raise
     
-    async def save_user(self, user: UserProfile):
-        """Save user profile with validation and error handling"""
+    def next_user_id(self) -> int:
+        """
+        Allocate an unused user ID from the table's sequence, skipping IDs
+        already taken by users saved with explicit IDs
+        """
+        user_id = next(self._user_ids)
+        while user_id in self._rows:
+            user_id = next(self._user_ids)
+        return user_id
+    
+    async def save_user(self, user: UserProfile, overwrite: bool = True):
+        """
+        Save user profile with validation and error handling. With
+        overwrite=False, an existing user with the same ID is an error.
+        """
         if not self.is_connected:
             raise RuntimeError("Database not connected")
         
@@ -76,20 +167,45 @@ class DatabaseConnection:
         if '@' not in user.email:
             raise ValueError("Invalid email format")
         
+        row = self._rows.get(user.user_id)
+        if row is not None and not overwrite:
+            raise ValueError(f"User {user.user_id} already exists")
+        
+        self.query_count += 1
         try:
-            self._users[user.user_id] = user
-            logger.info(f"User {user.user_id} saved successfully")
+            if row is None:
+                self._rows[user.user_id] = len(self._usernames)
+                self._usernames.append(user.username)
+                self._emails.append(user.email)
+                self._active.append(bool(user.is_active))
+                self._metadata.append(user.metadata)
+            else:
+                self._usernames[row] = user.username
+                self._emails[row] = user.email
+                self._active[row] = bool(user.is_active)
+                self._metadata[row] = user.metadata
+            logger.info("User %s saved successfully", user.user_id)
         except Exception as e:
-            logger.error(f"Failed to save user {user.user_id}: {e}")
+            logger.error("Failed to save user %s: %s", user.user_id, e)
             raise
+    
+    def scan_active(self) -> int:
+        """Count active users"""
+        return self._active.count(1)
 
 
 class UserService:
     """User management service with comprehensive error handling"""
     
-    def __init__(self, db: DatabaseConnection):
+    def __init__(self, db: DatabaseConnection, cache_size: int = USER_CACHE_SIZE,
+                 worker_id: Optional[int] = None):
         self.db = db
-        self._cache = {}
+        # User IDs come from the database's sequence; given a worker_id, they
+        # become Snowflake IDs so several processes can create users without
+        # colliding
+        self._worker_id = worker_id
+        self._cache: "OrderedDict[int, Dict]" = OrderedDict()
+        self._cache_size = cache_size
     
     async def authenticate_user(self, username: str, password: str) -> bool:
         """Authenticate user credentials"""
@@ -97,18 +213,14 @@ class UserService:
             raise ValueError("Username and password are required")
         
         try:
-            # In real implementation, check against database
-            # This is a demo - never hardcode credentials!
-            valid_users = {
-                'admin': 'secret123',
-                'user': 'password',
-                'demo': 'demo123'
-            }
-            
-            return valid_users.get(username) == password
+            expected = VALID_USERS.get(username)
+            # Constant-time comparison so timing doesn't leak how much matched
+            return expected is not None and hmac.compare_digest(
+                expected, _password_digest(password)
+            )
         
         except Exception as e:
-            logger.error(f"Authentication error for user {username}: {e}")
+            logger.error("Authentication error for user %s: %s", username, e)
             return False
     
     async def create_user(self, username: str, email: str) -> UserProfile:
@@ -122,7 +234,9 @@ class UserService:
                 raise ValueError("Valid email address required")
             
             # Create user profile
-            user_id = hash(username) % 10000  # Simple ID generation for demo
+            user_id = self.db.next_user_id()
+            if self._worker_id is not None:
+                user_id = snowflake_id(self._worker_id, user_id)
             user = UserProfile(
                 user_id=user_id,
                 username=username,
@@ -130,21 +244,48 @@ class UserService:
                 metadata={'created_by': 'system', 'version': 1}
             )
             
-            # Save to database
-            await self.db.save_user(user)
+            # Save to database, never replacing an existing user
+            await self.db.save_user(user, overwrite=False)
             
-            logger.info(f"Created user: {username} ({user_id})")
+            logger.info("Created user: %s (%s)", username, user_id)
             return user
             
         except ValueError as e:
-            logger.warning(f"Validation error creating user {username}: {e}")
+            logger.warning("Validation error creating user %s: %s", username, e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error creating user {username}: {e}")
+            logger.error("Unexpected error creating user %s: %s", username, e)
             raise RuntimeError("User creation failed")
     
+    async def create_users(self, accounts: List[Tuple[str, str]]) -> List[UserProfile]:
+        """Create several users from (username, email) pairs"""
+        return [await self.create_user(username, email) for username, email in accounts]
+    
+    async def save_user(self, user: UserProfile):
+        """Update a user, dropping their processed data from the cache"""
+        await self.db.save_user(user)
+        self._cache.pop(user.user_id, None)
+    
+    @staticmethod
+    def _copy_processed(data: Dict) -> Dict:
+        """Copy of cached processed data the caller is free to modify"""
+        return {
+            'user_info': dict(data['user_info']),
+            'metadata': dict(data['metadata']),
+            'processed_at': data['processed_at']
+        }
+    
     async def process_user_data(self, user_id: int) -> Dict:
-        """Process user data with comprehensive error handling"""
+        """
+        Process user data with comprehensive error handling. Users updated
+        through save_user are processed afresh; each call returns a new dict.
+        """
+        # Served from the LRU cache; processed_at is when it was first built
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            self._cache.move_to_end(user_id)
+            return self._copy_processed(cached)
+        
         try:
             user = await self.db.get_user(user_id)
             if not user:
@@ -158,32 +299,126 @@ class UserService:
                     'contact': user.email,
                     'status': 'active' if user.is_active else 'inactive'
                 },
-                'metadata': user.metadata,
-                'processed_at': asyncio.get_event_loop().time()
+                'metadata': dict(user.metadata),
+                'processed_at': time.monotonic()
             }
             
-            return processed_data
+            self._cache[user_id] = processed_data
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return self._copy_processed(processed_data)
             
         except ValueError as e:
-            logger.warning(f"Data processing validation error: {e}")
+            logger.warning("Data processing validation error: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Error processing user data for {user_id}: {e}")
+            logger.error("Error processing user data for %s: %s", user_id, e)
             raise RuntimeError("Data processing failed")
 
 
+@dataclass
+class PoolConfig:
+    """Connection pool sizing and recycling limits"""
+    min_size: int = 10
+    max_size: int = 50
+    max_queries: int = 50_000
+    max_inactive_lifetime: float = 300.0
+
+
+class ConnectionPool:
+    """
+    LIFO pool of connected databases, reused across sessions. A pool belongs
+    to the event loop it is started in: create it inside that loop and close
+    it (or use it as an async context manager) before the loop ends.
+    """
+    
+    def __init__(self, connection_string: str, config: Optional[PoolConfig] = None):
+        self.connection_string = connection_string
+        self.config = config or PoolConfig()
+        self._idle: "asyncio.LifoQueue[DatabaseConnection]" = asyncio.LifoQueue()
+        self._released_at: Dict[DatabaseConnection, float] = {}
+        self._size = 0
+        self._closed = False
+    
+    async def __aenter__(self) -> "ConnectionPool":
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.close()
+    
+    async def start(self):
+        """Open min_size connections up front"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        count = max(self.config.min_size - self._size, 0)
+        connections = await asyncio.gather(*(self._open() for _ in range(count)))
+        for db in connections:
+            self.release(db)
+    
+    async def _open(self) -> DatabaseConnection:
+        self._size += 1
+        try:
+            db = DatabaseConnection(self.connection_string)
+            await db.connect()
+            return db
+        except Exception:
+            self._size -= 1
+            raise
+    
+    def _discard(self, db: DatabaseConnection):
+        self._released_at.pop(db, None)
+        self._size -= 1
+        db.close()
+    
+    def _is_stale(self, db: DatabaseConnection) -> bool:
+        idle_for = asyncio.get_running_loop().time() - self._released_at[db]
+        return (db.query_count >= self.config.max_queries
+                or idle_for > self.config.max_inactive_lifetime)
+    
+    async def acquire(self) -> DatabaseConnection:
+        """Take the most recently used connection, opening one if none is idle"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        while True:
+            if self._idle.empty() and self._size < self.config.max_size:
+                return await self._open()
+            db = await self._idle.get()
+            if self._is_stale(db):
+                self._discard(db)
+                continue
+            del self._released_at[db]
+            return db
+    
+    def release(self, db: DatabaseConnection):
+        """Return a connection to the pool (closing it if the pool is closed)"""
+        if not db.is_connected:
+            self._size -= 1
+            return
+        if self._closed:
+            self._discard(db)
+            return
+        self._released_at[db] = asyncio.get_running_loop().time()
+        self._idle.put_nowait(db)
+    
+    def close(self):
+        """Close every idle connection; connections still in use close on release"""
+        self._closed = True
+        while not self._idle.empty():
+            self._discard(self._idle.get_nowait())
+
+
 @asynccontextmanager
-async def database_session(connection_string: str):
+async def database_session(pool: ConnectionPool):
     """Context manager for database sessions with proper cleanup"""
-    db = DatabaseConnection(connection_string)
+    db = await pool.acquire()
     try:
-        await db.connect()
         yield db
     except Exception as e:
-        logger.error(f"Database session error: {e}")
+        logger.error("Database session error: %s", e)
         raise
     finally:
-        # Cleanup would go here in real implementation
+        pool.release(db)
         logger.info("Database session closed")
 
 
@@ -192,32 +427,35 @@ async def main():
     connection_string = "postgresql://localhost/demo"
     
     try:
-        async with database_session(connection_string) as db:
-            service = UserService(db)
-            
-            # Test user creation
-            try:
-                user = await service.create_user("demo_user", "demo@example.com")
-                logger.info(f"Created user: {user}")
-                
-                # Test authentication
-                is_authenticated = await service.authenticate_user("demo_user", "wrong_password")
-                logger.info(f"Authentication result: {is_authenticated}")
-                
-                # Test data processing
-                processed = await service.process_user_data(user.user_id)
-                logger.info(f"Processed data: {json.dumps(processed, indent=2)}")
-                
-            except ValueError as e:
-                logger.warning(f"Validation error: {e}")
-            except RuntimeError as e:
-                logger.error(f"Runtime error: {e}")
+        # Pool sized for a demo; it is created and closed within this event loop
+        async with ConnectionPool(connection_string, PoolConfig(min_size=1)) as pool:
+            async with database_session(pool) as db:
+                service = UserService(db)
                 
+                # Test user creation
+                try:
+                    user = await service.create_user("demo_user", "demo@example.com")
+                    logger.info("Created user: %s", user)
+                    
+                    # Test authentication
+                    is_authenticated = await service.authenticate_user("demo_user", "wrong_password")
+                    logger.info("Authentication result: %s", is_authenticated)
+                    
+                    # Test data processing
+                    processed = await service.process_user_data(user.user_id)
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("Processed data: %s", _dumps(processed))
+                    
+                except ValueError as e:
+                    logger.warning("Validation error: %s", e)
+                except RuntimeError as e:
+                    logger.error("Runtime error: %s", e)
+                    
     except ConnectionError as e:
-        logger.error(f"Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         return 1
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         return 1
     
     return 0
@@ -231,5 +469,5 @@ if __name__ == "__main__":
         logger.info("Application interrupted by user")
         exit(130)
     except Exception as e:
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         exit(1)
\ No newline at end of file
@@ -1,10 +1,24 @@
+import time
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # optional: pip install numba
+    np = njit = None
+
+# Below this many values the compiled kernel's call overhead outweighs it
+NUMBER_KERNEL_MIN_ITEMS = 256
+
+_REQUIRED_CONFIG_KEYS = frozenset(('api_endpoint', 'timeout', 'retry_count', 'batch_size'))
+_REQUIRED_ITEM_FIELDS = frozenset(('id', 'type', 'data'))
+
+
 def large_complex_function(data, config, options):
     """
     This is a large function that might exceed token limits.
     It processes data according to configuration and options.
     """
     # Initialize variables
-    result = []
     processed_count = 0
     error_count = 0
     
@@ -16,10 +30,9 @@ def large_complex_function(data, config, options):
         raise TypeError("Configuration must be a dictionary")
     
     # Check required configuration keys
-    required_keys = ['api_endpoint', 'timeout', 'retry_count', 'batch_size']
-    for key in required_keys:
-        if key not in config:
-            raise KeyError(f"Required configuration key '{key}' is missing")
+    missing = _REQUIRED_CONFIG_KEYS - config.keys()
+    if missing:
+        raise KeyError(f"Required configuration keys missing: {sorted(missing)}")
     
     # Validate configuration values
     if config['timeout'] <= 0:
@@ -35,6 +48,12 @@ def large_complex_function(data, config, options):
     debug_mode = options.get('debug', False)
     verbose = options.get('verbose', False)
     max_workers = options.get('max_workers', 4)
+    ignore_errors = options.get('ignore_errors', False)
+    collect_errors = options.get('collect_errors', False)
+    progress_callback = options.get('progress_callback')
+    progress_interval = options.get('progress_interval_s', 0.0)
+    post_processors = options.get('post_processors', ())
+    validators = options.get('validators', ())
     
     # Input data validation
     if not data:
@@ -44,53 +63,79 @@ def large_complex_function(data, config, options):
     
     if not isinstance(data, (list, tuple)):
         data = [data]
+    n = len(data)
     
     # Process data in batches
     batch_size = config['batch_size']
-    total_batches = len(data) // batch_size + (1 if len(data) % batch_size else 0)
+    total_batches = -(-n // batch_size)
+    
+    # At most one result per item: fill a preallocated list through a write
+    # cursor, and trim it once all batches are done
+    result = [None] * n
+    out = 0
+    last_progress = time.monotonic()
+    
+    # Resolve the transformation list once for the whole call
+    transform_item = compile_transforms(options['transformations']) if 'transformations' in options else None
     
     for batch_index in range(total_batches):
         start_idx = batch_index * batch_size
-        end_idx = min(start_idx + batch_size, len(data))
+        end_idx = min(start_idx + batch_size, n)
         batch = data[start_idx:end_idx]
         
         if verbose:
             print(f"Processing batch {batch_index + 1}/{total_batches} ({len(batch)} items)")
         
-        # Process each item in the batch
-        batch_results = []
+        # Validate items and group their positions, ids and data by type, so
+        # each type is processed in one pass over its own columns
+        outcomes = [None] * len(batch)
+        columns_by_type = {}
         for item_index, item in enumerate(batch):
+            # Validate item structure
+            if not isinstance(item, dict):
+                outcomes[item_index] = TypeError(f"Item at index {start_idx + item_index} must be a dictionary")
+                continue
+            
+            # Check required fields
+            missing = _REQUIRED_ITEM_FIELDS - item.keys()
+            if missing:
+                outcomes[item_index] = KeyError(f"Required fields missing in item {start_idx + item_index}: {sorted(missing)}")
+                continue
+            
+            item_id, item_type, item_data = item['id'], item['type'], item['data']
+            # Keyed by the value's class too, so equal values of different
+            # types (1, 1.0 and True) don't share a bucket
+            type_key = (type(item_type), item_type)
             try:
-                # Validate item structure
-                if not isinstance(item, dict):
-                    raise TypeError(f"Item at index {start_idx + item_index} must be a dictionary")
-                
-                # Check required fields
-                required_fields = ['id', 'type', 'data']
-                for field in required_fields:
-                    if field not in item:
-                        raise KeyError(f"Required field '{field}' missing in item {start_idx + item_index}")
-                
-                # Process based on type
-                processed_item = None
-                if item['type'] == 'string':
-                    processed_item = process_string_item(item, config, options)
-                elif item['type'] == 'number':
-                    processed_item = process_number_item(item, config, options)
-                elif item['type'] == 'array':
-                    processed_item = process_array_item(item, config, options)
-                elif item['type'] == 'object':
-                    processed_item = process_object_item(item, config, options)
-                else:
-                    raise ValueError(f"Unknown item type: {item['type']}")
+                columns = columns_by_type.get(type_key)
+            except TypeError:  # unhashable type value
+                outcomes[item_index] = ValueError(f"Unknown item type: {item_type}")
+                continue
+            if columns is None:
+                columns = columns_by_type[type_key] = ([], [], [])
+            positions, item_ids, values = columns
+            positions.append(item_index)
+            item_ids.append(item_id)
+            values.append(item_data)
+        
+        # Process based on type
+        for (_, item_type), (positions, item_ids, values) in columns_by_type.items():
+            for position, outcome in zip(positions, process_items(item_type, item_ids, values, config, options)):
+                outcomes[position] = outcome
+        
+        # Handle each item's outcome in order
+        for item_index, (item, processed_item) in enumerate(zip(batch, outcomes)):
+            try:
+                if isinstance(processed_item, Exception):
+                    raise processed_item
                 
                 # Apply transformations
-                if 'transformations' in options:
-                    for transform in options['transformations']:
-                        processed_item = apply_transformation(processed_item, transform)
+                if transform_item is not None:
+                    processed_item = transform_item(processed_item)
                 
-                # Add to batch results
-                batch_results.append(processed_item)
+                # Add to results
+                result[out] = processed_item
+                out += 1
                 processed_count += 1
                 
                 if debug_mode:
@@ -104,48 +149,49 @@ def large_complex_function(data, config, options):
                     print(error_msg)
                 
                 # Handle error based on options
-                if options.get('ignore_errors', False):
+                if ignore_errors:
                     continue
-                elif options.get('collect_errors', False):
-                    batch_results.append({'error': error_msg, 'original_item': item})
+                elif collect_errors:
+                    result[out] = {'error': error_msg, 'original_item': item}
+                    out += 1
                 else:
                     raise RuntimeError(error_msg) from e
         
-        # Add batch results to overall results
-        result.extend(batch_results)
-        
-        # Progress callback if provided
-        if 'progress_callback' in options:
-            progress = (batch_index + 1) / total_batches
-            options['progress_callback'](progress, processed_count, error_count)
+        # Progress callback if provided, at most once per progress_interval_s
+        # but always for the last batch
+        if progress_callback is not None:
+            now = time.monotonic()
+            if progress_interval <= 0 or now - last_progress >= progress_interval or batch_index == total_batches - 1:
+                progress = (batch_index + 1) / total_batches
+                progress_callback(progress, processed_count, error_count)
+                last_progress = now
+    
+    del result[out:]
     
     # Post-processing
-    if 'post_processors' in options:
-        for processor in options['post_processors']:
-            result = processor(result, config, options)
+    for processor in post_processors:
+        result = processor(result, config, options)
     
     # Final validation
-    if 'validators' in options:
-        for validator in options['validators']:
-            if not validator(result, config, options):
-                raise ValueError("Result validation failed")
+    for validator in validators:
+        if not validator(result, config, options):
+            raise ValueError("Result validation failed")
     
     # Logging and statistics
     if verbose:
         print(f"Processing completed:")
         print(f"  Total items processed: {processed_count}")
         print(f"  Total errors: {error_count}")
-        print(f"  Success rate: {processed_count / len(data) * 100:.2f}%")
+        print(f"  Success rate: {processed_count / n * 100:.2f}%")
     
     return result
 
-def process_string_item(item, config, options):
+def process_string_item(item_id, data, config, options):
     """Process string-type items with various transformations."""
-    data = item['data']
-    
     # Basic validation
     if not isinstance(data, str):
         raise TypeError("String item data must be a string")
+    original_length = len(data)
     
     # Apply string transformations
     if options.get('trim_whitespace', True):
@@ -168,17 +214,57 @@ def process_string_item(item, config, options):
         raise ValueError(f"String length {len(data)} exceeds maximum {max_length}")
     
     return {
-        'id': item['id'],
+        'id': item_id,
         'type': 'string',
         'processed_data': data,
-        'original_length': len(item['data']),
+        'original_length': original_length,
         'processed_length': len(data)
     }
 
-def process_number_item(item, config, options):
-    """Process number-type items with validation and transformations."""
-    data = item['data']
+def process_string_items(item_ids, values, config, options):
+    """
+    Process many string-type items at once, reading the options once rather
+    than per item. Returns one entry per item, in order: the dict
+    process_string_item would return, or the exception it would raise.
+    """
+    trim_whitespace = options.get('trim_whitespace', True)
+    lowercase = options.get('lowercase', False)
+    uppercase = options.get('uppercase', False)
+    min_length = options.get('min_string_length', 0)
+    max_length = options.get('max_string_length', float('inf'))
     
+    outcomes = []
+    for item_id, data in zip(item_ids, values):
+        try:
+            if not isinstance(data, str):
+                raise TypeError("String item data must be a string")
+            original_length = len(data)
+            
+            if trim_whitespace:
+                data = data.strip()
+            if lowercase:
+                data = data.lower()
+            if uppercase:
+                data = data.upper()
+            
+            if len(data) < min_length:
+                raise ValueError(f"String length {len(data)} below minimum {min_length}")
+            if len(data) > max_length:
+                raise ValueError(f"String length {len(data)} exceeds maximum {max_length}")
+            
+            outcomes.append({
+                'id': item_id,
+                'type': 'string',
+                'processed_data': data,
+                'original_length': original_length,
+                'processed_length': len(data)
+            })
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+def process_number_item(item_id, data, config, options):
+    """Process number-type items with validation and transformations."""
     # Basic validation
     if not isinstance(data, (int, float)):
         raise TypeError("Number item data must be numeric")
@@ -204,17 +290,102 @@ def process_number_item(item, config, options):
         processed_data = abs(processed_data)
     
     return {
-        'id': item['id'],
+        'id': item_id,
         'type': 'number',
         'processed_data': processed_data,
         'original_value': data,
         'is_modified': processed_data != data
     }
 
-def process_array_item(item, config, options):
-    """Process array-type items with element validation."""
-    data = item['data']
+def _exact_float(value):
+    """value as a float if that conversion is lossless, else None"""
+    try:
+        converted = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return converted if converted == value else None
+
+if njit is not None:
+    @njit(cache=True)
+    def _number_kernel(values, min_value, max_value, do_round, do_abs):
+        """
+        process_number_item's arithmetic over a float64 column. Returns the
+        processed values and a status per value: 0 ok, -1 below min, 1 above max.
+        No fastmath: NaN must compare exactly as it does in Python.
+        """
+        processed = np.empty_like(values)
+        status = np.zeros(values.size, dtype=np.int8)
+        for i in range(values.size):
+            value = values[i]
+            if value < min_value:
+                status[i] = -1
+                continue
+            if value > max_value:
+                status[i] = 1
+                continue
+            if do_round:
+                value = np.rint(value)  # round half to even, like round(x, 0)
+            if do_abs:
+                value = abs(value)
+            processed[i] = value
+        return processed, status
+else:
+    _number_kernel = None
+
+def process_number_items(item_ids, values, config, options):
+    """
+    Process many number-type items at once.
     
+    Returns one entry per item, in order: the dict process_number_item would
+    return, or the exception it would raise. Large all-float columns go
+    through a compiled kernel when numba is installed.
+    """
+    min_value = options.get('min_number_value', float('-inf'))
+    max_value = options.get('max_number_value', float('inf'))
+    do_round = bool(options.get('round_numbers', False))
+    decimals = options.get('round_decimals', 0)
+    do_abs = bool(options.get('abs_numbers', False))
+    
+    # The kernel only covers floats (ints keep their type and precision in the
+    # scalar path), exactly representable bounds and rounding to whole numbers
+    float_min, float_max = _exact_float(min_value), _exact_float(max_value)
+    use_kernel = (
+        _number_kernel is not None
+        and len(values) >= NUMBER_KERNEL_MIN_ITEMS
+        and float_min is not None and float_max is not None
+        and (not do_round or (type(decimals) is int and decimals == 0))
+        and all(type(value) is float for value in values)
+    )
+    
+    outcomes = []
+    if not use_kernel:
+        for item_id, data in zip(item_ids, values):
+            try:
+                outcomes.append(process_number_item(item_id, data, config, options))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    
+    processed, status = _number_kernel(
+        np.array(values, dtype=np.float64), float_min, float_max, do_round, do_abs
+    )
+    for item_id, data, processed_data, code in zip(item_ids, values, processed.tolist(), status.tolist()):
+        if code < 0:
+            outcomes.append(ValueError(f"Number {data} below minimum {min_value}"))
+        elif code > 0:
+            outcomes.append(ValueError(f"Number {data} exceeds maximum {max_value}"))
+        else:
+            outcomes.append({
+                'id': item_id,
+                'type': 'number',
+                'processed_data': processed_data,
+                'original_value': data,
+                'is_modified': processed_data != data
+            })
+    return outcomes
+
+def process_array_item(item_id, data, config, options):
+    """Process array-type items with element validation."""
     # Basic validation
     if not isinstance(data, (list, tuple)):
         raise TypeError("Array item data must be a list or tuple")
@@ -249,26 +420,36 @@ def process_array_item(item, config, options):
                 raise RuntimeError(f"Error processing array element {i}: {str(e)}") from e
     
     return {
-        'id': item['id'],
+        'id': item_id,
         'type': 'array',
         'processed_data': processed_elements,
         'original_length': len(data),
         'processed_length': len(processed_elements)
     }
 
-def process_object_item(item, config, options):
-    """Process object-type items with nested structure validation."""
-    data = item['data']
-    
+def _required_object_fields(options):
+    """The 'required_object_fields' option as a frozenset, or None if unset."""
+    if 'required_object_fields' not in options:
+        return None
+    return frozenset(options['required_object_fields'])
+
+def process_object_item(item_id, data, config, options, required_fields=None):
+    """
+    Process object-type items with nested structure validation.
+    Batch callers pass required_fields from _required_object_fields(options)
+    to build it once rather than per item.
+    """
     # Basic validation
     if not isinstance(data, dict):
         raise TypeError("Object item data must be a dictionary")
     
     # Required fields validation
-    if 'required_object_fields' in options:
-        for field in options['required_object_fields']:
-            if field not in data:
-                raise KeyError(f"Required object field '{field}' is missing")
+    if required_fields is None:
+        required_fields = _required_object_fields(options)
+    if required_fields is not None:
+        missing = required_fields - data.keys()
+        if missing:
+            raise KeyError(f"Required object fields missing: {sorted(missing, key=repr)}")
     
     # Process nested data
     processed_data = {}
@@ -294,12 +475,68 @@ def process_object_item(item, config, options):
         processed_data[key] = processed_value
     
     return {
-        'id': item['id'],
+        'id': item_id,
         'type': 'object',
         'processed_data': processed_data,
         'field_count': len(processed_data)
     }
 
+def process_object_items(item_ids, values, config, options):
+    """
+    Process many object-type items, building the required field set once.
+    Returns one entry per item, in order: the processed item, or the
+    exception processing it raised.
+    """
+    try:
+        required_fields = _required_object_fields(options)
+    except Exception:
+        # Unusable field list: leave each item to raise building it
+        required_fields = None
+    
+    outcomes = []
+    for item_id, data in zip(item_ids, values):
+        try:
+            outcomes.append(process_object_item(item_id, data, config, options, required_fields))
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
+# Per-item processor for each item type
+ITEM_HANDLERS = {
+    'string': process_string_item,
+    'number': process_number_item,
+    'array': process_array_item,
+    'object': process_object_item,
+}
+
+# Specialised processors for a whole list of same-typed items
+BATCH_HANDLERS = {
+    'string': process_string_items,
+    'number': process_number_items,
+    'object': process_object_items,
+}
+
+def process_items(item_type, item_ids, values, config, options):
+    """
+    Process items that all have the given type, given as parallel lists of
+    their ids and data. Returns one entry per item, in order: the processed
+    item, or the exception processing it raised.
+    """
+    batch_handler = BATCH_HANDLERS.get(item_type)
+    if batch_handler is not None:
+        return batch_handler(item_ids, values, config, options)
+    
+    handler = ITEM_HANDLERS.get(item_type)
+    outcomes = []
+    for item_id, data in zip(item_ids, values):
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown item type: {item_type}")
+            outcomes.append(handler(item_id, data, config, options))
+        except Exception as e:
+            outcomes.append(e)
+    return outcomes
+
 def apply_transformation(item, transform):
     """Apply a transformation function to an item."""
     if callable(transform):
@@ -317,4 +554,60 @@ def apply_transformation(item, transform):
                 field_value = transform['field_value']
                 item[field_name] = field_value
     
-    return item
\ No newline at end of file
+    return item
+
+def _compile_transform(transform):
+    """Resolve one transformation to a step function, or None for a no-op."""
+    if callable(transform):
+        return transform
+    if not isinstance(transform, dict) or 'type' not in transform:
+        return None
+    
+    if transform['type'] == 'rename_field':
+        if 'old_name' not in transform or 'new_name' not in transform:
+            # Malformed: let apply_transformation raise for each item
+            return lambda item: apply_transformation(item, transform)
+        old_name = transform['old_name']
+        new_name = transform['new_name']
+        if old_name == new_name:
+            return None
+        
+        def rename_field(item):
+            if old_name in item:
+                item[new_name] = item.pop(old_name)
+            return item
+        return rename_field
+    
+    if transform['type'] == 'add_field':
+        if 'field_name' not in transform or 'field_value' not in transform:
+            return lambda item: apply_transformation(item, transform)
+        field_name = transform['field_name']
+        field_value = transform['field_value']
+        
+        def add_field(item):
+            item[field_name] = field_value
+            return item
+        return add_field
+    
+    return None
+
+def compile_transforms(transforms):
+    """
+    Compose a list of transformations into one function of an item, with the
+    checks apply_transformation makes per item resolved up front.
+    """
+    try:
+        steps = [step for step in map(_compile_transform, transforms) if step is not None]
+    except TypeError:
+        # Not a list: keep the error per item, as apply_transformation gives
+        def transform_item(item):
+            for transform in transforms:
+                item = apply_transformation(item, transform)
+            return item
+        return transform_item
+    
+    def transform_item(item):
+        for step in steps:
+            item = step(item)
+        return item
+    return transform_item
\ No newline at end of file